@@ -0,0 +1,79 @@
+"""Checks tseries.gls_periodograms against astropy's LombScargle and times it against one astropy
+call per series with the default method.
+
+Usage:
+    python benchmarks/bench_gls.py [--sizes 200 800 3000] [--samples-per-peak 10]
+
+Exits with an error if the power differs from the exact (method='slow') periodogram by more than
+1e-4 of the highest peak, or if the best period of a series changes.
+"""
+import argparse
+import time
+
+import numpy as np
+from astropy.timeseries import LombScargle
+
+from warp.tseries import frequency_grid, gls_periodograms
+
+SERIES = ('rv', 'ccf_fwhm', 'ccf_bispan', 'ccf_contrast')
+
+
+def best_of(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def rv_like(n_points, rng):
+    """Irregular RV-like sampling over 10 years, with a 23.4 d signal and some missing values."""
+    t = np.sort(rng.uniform(0, 3650, n_points))
+    ys, yerrs = {}, {}
+    for k, name in enumerate(SERIES):
+        err = rng.uniform(0.5, 3, n_points)
+        ys[name] = (k + 1) * np.sin(2 * np.pi * t / 23.4 + k) + rng.normal(0, err)
+        yerrs[name] = err
+    ys['ccf_fwhm'][rng.choice(n_points, n_points // 50, replace=False)] = np.nan
+    return t, ys, yerrs
+
+
+def check(sizes, samples_per_peak, seed=0):
+    rng = np.random.default_rng(seed)
+    for n_points in sizes:
+        t, ys, yerrs = rv_like(n_points, rng)
+        freq = frequency_grid(t, max_freq=1., samples_per_peak=samples_per_peak)
+
+        t_batch, (periodograms, summary) = best_of(lambda: gls_periodograms(
+            t, ys, yerrs, max_freq=1., samples_per_peak=samples_per_peak))
+
+        def astropy_default():
+            powers = {}
+            for name in SERIES:
+                m = np.isfinite(ys[name])
+                powers[name] = LombScargle(t[m], ys[name][m], yerrs[name][m]).power(freq)
+            return powers
+        t_astropy, _ = best_of(astropy_default)
+
+        errors = []
+        for name in SERIES:
+            m = np.isfinite(ys[name])
+            exact = LombScargle(t[m], ys[name][m], yerrs[name][m]).power(freq, method='slow')
+            power = periodograms.loc[periodograms.series == name, 'power'].to_numpy()
+            errors.append(np.max(np.abs(power - exact)) / exact.max())
+            if not np.isclose(summary.loc[name, 'best_period'], 1 / freq[np.argmax(exact)]):
+                raise AssertionError(f"{name}: best period changed")
+        print(f"{n_points} points, {len(SERIES)} series, {len(freq)} frequencies: "
+              f"gls_periodograms {t_batch:.3f} s, astropy default x{len(SERIES)} {t_astropy:.3f} s, "
+              f"max error / highest peak {max(errors):.1e}")
+        if max(errors) > 1e-4:
+            raise AssertionError(f"error {max(errors):.1e} above 1e-4")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 800, 3000])
+    parser.add_argument('--samples-per-peak', type=float, default=10)
+    args = parser.parse_args()
+    check(args.sizes, args.samples_per_peak)
@@ -0,0 +1,83 @@
+"""Compares the in-memory and memory-mapped (low_memory) paths of tess.lc_from_tpf on a synthetic
+TESScut-like TPF: peak Python memory (tracemalloc), run time and agreement of the light curves.
+
+Usage:
+    python benchmarks/bench_lc_from_tpf.py [--n-cadences 15000] [--size 40]
+
+The uncorrected fluxes must agree to 1e-5. The corrected fluxes are compared with the run-to-run
+scatter of the randomised PCA of the default path.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+import lightkurve as lk
+import numpy as np
+from lightkurve.targetpixelfile import TargetPixelFileFactory
+
+from warp.tess import lc_from_tpf
+
+
+def make_tpf(path, n_cadences, size, sector=1, seed=0):
+    """Writes a TPF with a star at the centre, a growing background gradient and white noise."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[:size, :size]
+    star = 5000 * np.exp(-((x - size / 2) ** 2 + (y - size / 2) ** 2) / 4)
+    factory = TargetPixelFileFactory(n_cadences=n_cadences, n_rows=size, n_cols=size)
+    background = np.linspace(0, 200, n_cadences)
+    flux_err = np.full((size, size), 5.)
+    for i in range(n_cadences):
+        flux = star * (1 + 1e-3 * np.sin(i / 30)) + background[i] * (1 + x / size) + \
+            rng.normal(0, 5, (size, size))
+        factory.add_cadence(frameno=i, flux=flux, flux_err=flux_err,
+                            header={'TSTART': 1000 + i / 720, 'TSTOP': 1000 + (i + 1) / 720})
+    tpf = factory.get_tpf(hdu0_keywords={'TELESCOP': 'TESS', 'SECTOR': sector},
+                          ext_info={'1CRV5P': 100, '2CRV5P': 200})
+    tpf.to_fits(path, overwrite=True)
+
+
+def run(path, low_memory):
+    # The TPF is kept alive outside the measurement: when it is garbage collected, astropy copies
+    # its memory-mapped columns, whatever the path used.
+    tpf = lk.read(path)
+    tracemalloc.start()
+    start = time.perf_counter()
+    corrected, uncorrected = lc_from_tpf(tpf, verbose=True, low_memory=low_memory)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return corrected, uncorrected, elapsed, peak
+
+
+def main(n_cadences, size):
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tpf.fits')
+        make_tpf(path, n_cadences, size)
+        print(f"TPF {size}x{size}, {n_cadences} cadences, {os.path.getsize(path) / 2**20:.0f} MB")
+        results = {}
+        for name, low_memory in (('default', False), ('default (rerun)', False), ('low_memory', True)):
+            results[name] = run(path, low_memory)
+            print(f"{name:16s} peak {results[name][3] / 2**20:7.0f} MB, {results[name][2]:.1f} s")
+
+    def relative_difference(a, b):
+        return np.max(np.abs(a.flux.value - b.flux.value)) / np.median(np.abs(b.flux.value))
+
+    default, rerun, low_memory = results['default'], results['default (rerun)'], results['low_memory']
+    uncorrected_diff = relative_difference(low_memory[1], default[1])
+    print(f"Uncorrected flux, max relative difference: {uncorrected_diff:.1e}")
+    print(f"Corrected flux, max relative difference: {relative_difference(low_memory[0], default[0]):.1e} "
+          f"(default path run-to-run: {relative_difference(rerun[0], default[0]):.1e})")
+    if uncorrected_diff > 1e-5:
+        raise AssertionError("The uncorrected light curves differ")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-cadences', type=int, default=15000)
+    parser.add_argument('--size', type=int, default=40)
+    args = parser.parse_args()
+    main(args.n_cadences, args.size)
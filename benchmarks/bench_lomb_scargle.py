@@ -0,0 +1,99 @@
+"""Checks tseries.fast_lomb_scargle against astropy's LombScargle and times both, then compares
+tess.get_numax_init with its previous direct-sum implementation.
+
+Usage:
+    python benchmarks/bench_lomb_scargle.py [--sizes 100000 1000000] [--numax-points 185000]
+
+Exits with an error if the error relative to the highest peak exceeds 1e-4, or if get_numax_init
+changes its numax guess.
+"""
+import argparse
+import time
+
+import numpy as np
+from astropy.timeseries import LombScargle
+from scipy.signal import savgol_filter
+
+from warp.tess import get_numax_init
+from warp.tseries import fast_lomb_scargle
+
+
+def best_of(func, repeat=2):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def reference_get_numax_init(time, flux):
+    """The previous tess.get_numax_init, with astropy's O(N*M) power on the irregular-looking grid."""
+    m = np.isfinite(time) & np.isfinite(flux)
+    time, flux = time[m], flux[m]
+    flux = flux - np.nanmedian(flux)
+    flux = flux / np.nanmedian(np.abs(flux))
+    freq = np.linspace(1, 300, 5000)
+    power = np.array(LombScargle(time, flux).power(freq * 1e-6))
+    smooth = savgol_filter(power, 151, 3)
+    mask = (freq >= 10) & (freq <= 250)
+    return freq[mask][np.argmax(smooth[mask])], freq, power, smooth
+
+
+def tess_like(n_points, cadence, rng):
+    """n_points samples at the given cadence (days), with a 1 d gap every 13.7 d."""
+    t = np.arange(n_points) * cadence
+    t = t[(t % 13.7) < 12.7]
+    y = 1e-3 * np.sin(2 * np.pi * t * 10.) + rng.normal(0, 1e-3, t.size)
+    return t, y
+
+
+def check_periodograms(sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    for n_points in sizes:
+        cadence = 120 / 86400 if n_points <= 200_000 else 20 / 86400
+        t, y = tess_like(n_points, cadence, rng)
+        df = 1 / (t.max() - t.min()) / 10
+        freq = np.arange(df, 24, df)
+        ls = LombScargle(t, y)
+        timings, powers = {}, {}
+        timings['astropy fast'], powers['astropy fast'] = best_of(
+            lambda: ls.power(freq, method='fast', normalization='psd'))
+        timings['astropy fasper'], powers['astropy fasper'] = best_of(
+            lambda: ls.power(freq, method='fast', normalization='psd',
+                             method_kwds=dict(algorithm='fasper')))
+        timings['warp'], powers['warp'] = best_of(
+            lambda: fast_lomb_scargle(t, y, freq, normalization='psd'))
+        timings['warp float32'], powers['warp float32'] = best_of(
+            lambda: fast_lomb_scargle(t, y, freq, normalization='psd', use_float32=True))
+        # direct sum on a subset of the grid as the reference
+        idx = np.linspace(0, len(freq) - 1, 200).astype(int)
+        direct = ls.power(freq[idx], method='cython', normalization='psd')
+        print(f"{t.size} samples, {len(freq)} frequencies:")
+        for name in timings:
+            error = np.max(np.abs(powers[name][idx] - direct)) / direct.max()
+            print(f"  {name:15s} {timings[name]:6.2f} s, max error / highest peak {error:.1e}")
+            if name.startswith('warp') and error > 1e-4:
+                raise AssertionError(f"{name}: error {error:.1e} above 1e-4")
+
+
+def check_numax_init(n_points, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_points) * 120.  # seconds, as get_numax_init expects
+    flux = 1 + 1e-4 * np.sin(2 * np.pi * 80e-6 * t) + rng.normal(0, 1e-4, n_points)
+    t_ref, ref = best_of(lambda: reference_get_numax_init(t, flux), repeat=1)
+    t_new, new = best_of(lambda: get_numax_init(t, flux), repeat=1)
+    error = np.max(np.abs(new[2] - ref[2])) / ref[2].max()
+    print(f"get_numax_init, {n_points} samples: reference {t_ref:.2f} s, now {t_new:.2f} s, "
+          f"numax {ref[0]:.2f} / {new[0]:.2f} uHz, max power error / highest peak {error:.1e}")
+    if new[0] != ref[0]:
+        raise AssertionError("get_numax_init changed its numax guess")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--numax-points', type=int, default=185_000)
+    args = parser.parse_args()
+    check_periodograms(args.sizes)
+    check_numax_init(args.numax_points)
@@ -0,0 +1,99 @@
+"""Checks stats.mad_clip_mask against the previous per-group implementation and times both.
+
+Usage:
+    python benchmarks/bench_mad_clip.py [--n-points 1000000] [--n-groups 10000] [--n-cases 300]
+
+Exits with an error if a mask differs from the reference.
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from warp.stats import mad_clip_mask
+
+
+def reference_mad_clip_mask(values, groups=None, threshold=5, n_iter=3):
+    """The previous implementation of stats.mad_clip_mask, one Python loop per group."""
+    values = np.asarray(values)
+    mask = np.ones(len(values), dtype=bool)
+    if groups is None:
+        groups = np.array(["__all__"] * len(values))
+    else:
+        groups = np.asarray(groups)
+    for g in np.unique(groups):
+        idx = np.where(groups == g)[0]
+        submask = np.ones(len(idx), dtype=bool)
+        subvals = values[idx]
+        for _ in range(n_iter):
+            median = np.median(subvals[submask])
+            mad = np.median(np.abs(subvals[submask] - median))
+            if mad == 0:
+                break
+            modz = 0.6745 * (subvals - median) / mad
+            new_submask = np.abs(modz) < threshold
+            if np.all(new_submask == submask):
+                break
+            submask = new_submask
+        mask[idx] = submask
+    return mask
+
+
+def random_case(rng):
+    """Small data set with ties, constant (zero MAD) groups, outliers and NaNs."""
+    n = rng.integers(1, 200)
+    n_groups = rng.integers(1, 8)
+    values = rng.standard_normal(n)
+    if rng.random() < 0.3:
+        values = np.round(values, 1)
+    values[rng.random(n) < 0.05] += rng.normal(0, 20, 1)
+    groups = rng.integers(0, n_groups, n)
+    if rng.random() < 0.3:
+        values[groups == 0] = 1.0
+    if rng.random() < 0.2:
+        values[rng.random(n) < 0.02] = np.nan
+    return values, groups if rng.random() < 0.9 else None
+
+
+def check_equivalence(n_cases, seed=0):
+    rng = np.random.default_rng(seed)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # median of all-NaN groups
+        for case in range(n_cases):
+            values, groups = random_case(rng)
+            for threshold in (2, 3, 5):
+                for n_iter in (1, 3, 10):
+                    new = mad_clip_mask(values, groups, threshold=threshold, n_iter=n_iter)
+                    ref = reference_mad_clip_mask(values, groups, threshold=threshold, n_iter=n_iter)
+                    if not np.array_equal(new, ref):
+                        raise AssertionError(
+                            f"Case {case} (threshold={threshold}, n_iter={n_iter}): masks differ")
+    print(f"Equivalence: {n_cases} random cases x 9 settings, identical masks.")
+
+
+def benchmark(n_points, n_groups, threshold=3, n_iter=3, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.standard_normal(n_points)
+    values[rng.random(n_points) < 0.01] += 10
+    groups = rng.integers(0, n_groups, n_points)
+    timings = {}
+    for name, func in (('reference', reference_mad_clip_mask), ('mad_clip_mask', mad_clip_mask)):
+        start = time.perf_counter()
+        mask = func(values, groups, threshold=threshold, n_iter=n_iter)
+        timings[name] = time.perf_counter() - start
+        timings[name + '_kept'] = mask.sum()
+    assert timings['reference_kept'] == timings['mad_clip_mask_kept']
+    print(f"{n_points} points in {n_groups} groups, threshold {threshold}, n_iter {n_iter}: "
+          f"reference {timings['reference']:.2f} s, mad_clip_mask {timings['mad_clip_mask']:.2f} s "
+          f"({timings['reference'] / timings['mad_clip_mask']:.1f}x)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-points', type=int, default=1_000_000)
+    parser.add_argument('--n-groups', type=int, default=10_000)
+    parser.add_argument('--n-cases', type=int, default=300)
+    args = parser.parse_args()
+    check_equivalence(args.n_cases)
+    benchmark(args.n_points, args.n_groups)
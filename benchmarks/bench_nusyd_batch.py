@@ -0,0 +1,78 @@
+"""Compares nusyd.nuSYDBatch with a loop of nuSYD.run on synthetic one-sector TESS light curves of
+red giants: run time, and agreement of numax, widths and Monte Carlo errors.
+
+Usage:
+    python benchmarks/bench_nusyd_batch.py [--n-stars 1000] [--mc-iter 0]
+
+numax and the half-maximum widths must be identical. The Monte Carlo draws differ between the two
+paths, so the errors are only compared statistically.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from warp.nusyd import common_frequency_grid, nuSYD, nuSYDBatch
+
+
+def make_light_curves(n_stars, seed=42):
+    """10-min cadence, ~27 d light curves (ppm) with a Gaussian envelope of modes around numax
+    drawn in [25, 150] uHz, and guesses within 15% of the true numax."""
+    rng = np.random.default_rng(seed)
+    light_curves, numax = [], rng.uniform(25, 150, n_stars)
+    for nm in numax:
+        t = np.arange(1400, 1400 + 27 + rng.uniform(-2, 2), 10 / 60 / 24)
+        modes = np.arange(0.25 * nm, 1.75 * nm, 0.26 * nm ** 0.772 / 3) / 11.574  # c/d
+        amplitudes = 3e-4 * np.exp(-0.5 * ((modes * 11.574 - nm) / (0.2 * nm)) ** 2)
+        y = 2e-4 * rng.standard_normal(len(t))
+        for a, f in zip(amplitudes, modes):
+            y += a * np.sin(2 * np.pi * f * t + rng.uniform(0, 2 * np.pi))
+        light_curves.append((t, y * 1e6))
+    return light_curves, numax, numax * rng.uniform(0.85, 1.15, n_stars)
+
+
+def main(n_stars, mc_iter):
+    light_curves, numax, guesses = make_light_curves(n_stars)
+    grid = common_frequency_grid([t.max() - t.min() for t, _ in light_curves])
+
+    start = time.perf_counter()
+    loop = []
+    for (t, y), guess in zip(light_curves, guesses):
+        result = nuSYD(t, y, guess_numax=guess, lc_type='TESS', verbose=False, freq_grid=grid,
+                       band_limited=True, mc_iter=mc_iter, mc_seed=1).run()
+        loop.append((result['numax'], *result['widths'], result['errors']))
+    t_loop = time.perf_counter() - start
+    loop = np.array(loop, dtype=float)
+
+    start = time.perf_counter()
+    batch = nuSYDBatch(light_curves, guess_numax=guesses, lc_type='TESS', mc_iter=mc_iter, mc_seed=1,
+                       freq_grid=grid, verbose=False)
+    result = batch.run()
+    t_batch = time.perf_counter() - start
+    start = time.perf_counter()
+    batch._psd_matrix()
+    t_psd = time.perf_counter() - start
+
+    print(f"{n_stars} stars, mc_iter={mc_iter}: loop {t_loop:.1f} s, batch {t_batch:.1f} s "
+          f"({t_loop / t_batch:.1f}x), periodograms {t_psd:.1f} s "
+          f"({(t_loop - t_psd) / (t_batch - t_psd):.1f}x without them)")
+    numax_diff = np.nanmax(np.abs(loop[:, 0] - result['numax']))
+    width_diff = np.nanmax(np.abs(loop[:, 1:3] - result['widths']))
+    print(f"max |numax difference| {numax_diff:.1e} uHz, max |width difference| {width_diff:.1e} uHz, "
+          f"failed loop/batch {np.isnan(loop[:, 0]).sum()}/{np.isnan(result['numax']).sum()}, "
+          f"median |numax/true - 1| {np.nanmedian(np.abs(result['numax'] / numax - 1)):.3f}")
+    if mc_iter > 0:
+        ratio = result['errors'] / loop[:, 3]
+        print(f"error ratio batch/loop: median {np.nanmedian(ratio):.2f}, "
+              f"5-95% {np.nanpercentile(ratio, 5):.2f}-{np.nanpercentile(ratio, 95):.2f}")
+    if not np.array_equal(np.isnan(loop[:, 0]), np.isnan(result['numax'])) or numax_diff > 1e-6 \
+            or width_diff > 1e-6:
+        raise AssertionError("nuSYDBatch and nuSYD.run disagree")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-stars', type=int, default=1000)
+    parser.add_argument('--mc-iter', type=int, default=0)
+    args = parser.parse_args()
+    main(args.n_stars, args.mc_iter)
@@ -1 +1,2 @@
 from .core import Star
+from .collection import StarCollection
@@ -0,0 +1,210 @@
+import os
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+import astropy.units as u
+
+_columns = ['name', 'pmra', 'pmdec', 'plx_value', 'source']
+
+
+def _clean_name(name):
+    return str(name).replace(' ', '').lower()
+
+
+def _connect(cache_dir=None):
+    from .cache import get_cache_dir
+    db_path = os.path.join(get_cache_dir(cache_dir=cache_dir), 'astrometry.sqlite')
+    con = sqlite3.connect(db_path)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS astrometry (
+            key TEXT PRIMARY KEY,
+            name TEXT,
+            pmra REAL,
+            pmdec REAL,
+            parallax REAL,
+            ruwe REAL,
+            source TEXT,
+            fetched_at REAL
+        )""")
+    return con
+
+
+def _to_result(pmra, pmdec, parallax, source, ruwe=None):
+    return {
+        "pmra": float(pmra) * u.mas/u.yr,
+        "pmdec": float(pmdec) * u.mas/u.yr,
+        "parallax": float(parallax) * u.mas,
+        "source": source,
+        "ruwe": ruwe,
+    }
+
+
+def load_astrometry(names, cache_dir=None):
+    """Read the astrometry of the given stars from the local SQLite store.
+
+    Args:
+        names (list): Names of the stars.
+        cache_dir (str, optional): Root of the cache. Defaults to config.cache_dir.
+
+    Returns:
+        dict: {name: result} for the stars found in the store, in the format returned by
+              utils.get_astrometric_data.
+    """
+    if isinstance(names, str):
+        names = [names]
+    keys = {_clean_name(name): name for name in names}
+    if len(keys) == 0:
+        return {}
+    con = _connect(cache_dir)
+    try:
+        rows = con.execute(
+            f"SELECT key, pmra, pmdec, parallax, ruwe, source FROM astrometry "
+            f"WHERE key IN ({','.join('?' * len(keys))})", list(keys)).fetchall()
+    finally:
+        con.close()
+    return {keys[key]: _to_result(pmra, pmdec, plx, source, ruwe)
+            for key, pmra, pmdec, plx, ruwe, source in rows}
+
+
+def store_astrometry(results, cache_dir=None):
+    """Write astrometric results ({name: result}) to the local SQLite store."""
+    now = time.time()
+    rows = [(_clean_name(name), name,
+             res['pmra'].to(u.mas/u.yr).value,
+             res['pmdec'].to(u.mas/u.yr).value,
+             res['parallax'].to(u.mas).value,
+             res.get('ruwe'),
+             res['source'], now)
+            for name, res in results.items() if res is not None]
+    con = _connect(cache_dir)
+    try:
+        with con:
+            con.executemany(
+                "INSERT OR REPLACE INTO astrometry VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    finally:
+        con.close()
+    return
+
+
+def _simbad_row_names(simbad, names):
+    """Input name of each row of a Simbad.query_objects table, from the user_specified_id column or
+    the 1-based object number of the input list (object_number_id, or SCRIPT_NUMBER_ID in older
+    astroquery versions). Rows which cannot be matched get None."""
+    columns = {c.lower(): c for c in simbad.columns}
+    if 'user_specified_id' in columns:
+        return [str(v.decode() if isinstance(v, bytes) else v) if v is not None else None
+                for v in simbad[columns['user_specified_id']]]
+    for col in ('object_number_id', 'script_number_id'):
+        if col in columns:
+            numbers = pd.to_numeric(simbad[columns[col]], errors='coerce')
+            return [names[int(n) - 1] if np.isfinite(n) and 1 <= n <= len(names) else None
+                    for n in numbers]
+    # Unresolved names are dropped from the table, so the rows are aligned with the input only
+    # if none is missing
+    if len(simbad) == len(names):
+        return list(names)
+    print("[WARN] Could not match the SIMBAD rows to the input names, ignoring the SIMBAD results.")
+    return [None] * len(simbad)
+
+
+def query_astrometry_bulk(names, verbose=True):
+    """Retrieve the astrometry of many stars with one SIMBAD and one Gaia query.
+
+    SIMBAD resolves the names to Gaia DR3 source ids (and provides its own proper motions and
+    parallaxes), then a single ADQL query retrieves the Gaia DR3 solutions. Gaia values are used
+    with the same quality cuts as gaia.query_gaia, SIMBAD values otherwise.
+
+    Args:
+        names (list): Names of the stars.
+        verbose (bool, optional): Defaults to True.
+
+    Returns:
+        dict: {name: result} in the format returned by utils.get_astrometric_data, None for the
+              stars which could not be resolved.
+    """
+    from astroquery.simbad import Simbad
+    from astroquery.gaia import Gaia
+
+    names = list(names)
+    Simbad.reset_votable_fields()
+    Simbad.add_votable_fields('pmra', 'pmdec', 'plx_value', 'ids')
+    simbad = Simbad.query_objects(names).to_pandas()
+    simbad['user_specified_id'] = _simbad_row_names(simbad, names)
+
+    results = {name: None for name in names}
+    gaia_ids = {}
+    for _, row in simbad.iterrows():
+        name = row['user_specified_id']
+        if name not in results:
+            continue
+        ids = str(row.get('ids', '')).split('|')
+        gaia_id = [c.replace('Gaia DR3', '').strip()
+                   for c in ids if c.startswith('Gaia DR3')]
+        if len(gaia_id) > 0:
+            gaia_ids[int(gaia_id[0])] = name
+        if np.all(np.isfinite([row['pmra'], row['pmdec'], row['plx_value']])):
+            results[name] = _to_result(
+                row['pmra'], row['pmdec'], row['plx_value'], 'simbad')
+
+    if len(gaia_ids) > 0:
+        job = Gaia.launch_job_async(f"""
+        SELECT source_id, parallax, parallax_error, pmra, pmdec, ruwe
+        FROM gaiadr3.gaia_source
+        WHERE source_id IN ({','.join(str(c) for c in gaia_ids)})
+        """)
+        gaia = job.get_results().to_pandas()
+        gaia.columns = [c.lower() for c in gaia.columns]
+        for _, row in gaia.iterrows():
+            name = gaia_ids.get(int(row['source_id']))
+            if name is None:
+                continue
+            par_snr = row['parallax'] / \
+                row['parallax_error'] if row['parallax_error'] else 0
+            ruwe = row['ruwe'] if np.isfinite(row['ruwe']) else None
+            if (row['parallax'] > 0) and (par_snr >= 3) and (ruwe is None or ruwe < 1.4):
+                results[name] = _to_result(
+                    row['pmra'], row['pmdec'], row['parallax'], 'gaia', ruwe)
+    if verbose:
+        n_gaia = sum(1 for r in results.values()
+                     if r is not None and r['source'] == 'gaia')
+        n_found = sum(1 for r in results.values() if r is not None)
+        print(
+            f"[INFO] Retrieved astrometry for {n_found}/{len(names)} stars ({n_gaia} from Gaia).")
+    return results
+
+
+def prefetch_astrometry(names, use_cache=True, refresh=False, cache_dir=None, verbose=True):
+    """Resolve the astrometry of a whole target list, querying only the stars missing from the
+    local store, and return it as an astrometric table usable by Star(simbad_table=...).
+
+    Args:
+        names (list): Names of the stars.
+        use_cache (bool, optional): Whether to read from and write to the local store. Defaults to True.
+        refresh (bool, optional): If true, all the stars are queried again. Defaults to False.
+        cache_dir (str, optional): Root of the cache. Defaults to config.cache_dir.
+        verbose (bool, optional): Defaults to True.
+
+    Returns:
+        pd.DataFrame: The astrometric table (name, pmra, pmdec, plx_value, source).
+    """
+    names = list(dict.fromkeys(names))
+    results = load_astrometry(names, cache_dir=cache_dir) \
+        if use_cache and not refresh else {}
+    missing = [name for name in names if name not in results]
+    if verbose:
+        print(
+            f"[INFO] {len(results)} stars found in the astrometry store, querying {len(missing)}.")
+    if len(missing) > 0:
+        queried = query_astrometry_bulk(missing, verbose=verbose)
+        if use_cache:
+            store_astrometry(queried, cache_dir=cache_dir)
+        results.update({k: v for k, v in queried.items() if v is not None})
+    rows = [{
+        'name': name,
+        'pmra': res['pmra'].value,
+        'pmdec': res['pmdec'].value,
+        'plx_value': res['parallax'].value,
+        'source': res['source'],
+    } for name, res in results.items()]
+    return pd.DataFrame(rows, columns=_columns)
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+
+
+def get_cache_dir(subdir=None, cache_dir=None):
+    """Return the local cache directory, creating it if needed.
+
+    Args:
+        subdir (str, optional): Sub-directory of the cache (e.g. 'dace'). Defaults to None.
+        cache_dir (str, optional): Root of the cache. Defaults to config.cache_dir.
+
+    Returns:
+        str: Path to the cache directory.
+    """
+    from .config import cache_dir as default_cache_dir
+    path = cache_dir if cache_dir is not None else default_cache_dir
+    if subdir is not None:
+        path = os.path.join(path, subdir)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_key(*parts):
+    """Build a short, stable hash from the given key parts.
+
+    Args:
+        *parts: JSON-serialisable values identifying the cached object.
+
+    Returns:
+        str: A 16 characters hexadecimal digest.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+class FileCache:
+    """Size-bounded directory of cached files with least-recently-used eviction.
+
+    Entries are plain files named after their key. Their modification time is the time they were
+    stored, used for expiry, and their access time is refreshed on every read, used for eviction.
+
+    Args:
+        subdir (str): Sub-directory of the cache root holding the entries (e.g. 'tesscut').
+        max_bytes (int, optional): Maximum total size of the entries. The least recently used
+            entries are removed when it is exceeded. Defaults to None (no limit).
+        max_age (float, optional): Entries older than max_age seconds are treated as missing.
+            Defaults to None (entries never expire).
+        cache_dir (str, optional): Root of the cache. Defaults to config.cache_dir.
+    """
+
+    def __init__(self, subdir, max_bytes=None, max_age=None, cache_dir=None):
+        self.directory = get_cache_dir(subdir, cache_dir=cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    def path(self, key, suffix=''):
+        """Path of the entry for key, whether it exists or not."""
+        return os.path.join(self.directory, f'{key}{suffix}')
+
+    def get(self, key, suffix='', max_age=None):
+        """Return the path of the entry for key, or None if it is missing or expired.
+
+        Args:
+            key (str): Key of the entry, see cache_key.
+            suffix (str, optional): File extension of the entry. Defaults to ''.
+            max_age (float, optional): Overrides the max_age of the cache. Defaults to None.
+
+        Returns:
+            str: Path of the entry, or None.
+        """
+        import time
+        path = self.path(key, suffix)
+        max_age = self.max_age if max_age is None else max_age
+        try:
+            stored = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+        now = time.time()
+        if max_age is not None and now - stored > max_age:
+            self.stats['misses'] += 1
+            return None
+        os.utime(path, (now, stored))
+        self.stats['hits'] += 1
+        return path
+
+    def put(self, key, source, suffix=''):
+        """Move the file source into the cache as the entry for key, then evict old entries.
+
+        Args:
+            key (str): Key of the entry.
+            source (str): Path of the file to store. It is moved, not copied.
+            suffix (str, optional): File extension of the entry. Defaults to ''.
+
+        Returns:
+            str: Path of the entry.
+        """
+        path = self.path(key, suffix)
+        os.replace(source, path)
+        os.utime(path)
+        self.stats['writes'] += 1
+        self.evict(keep=path)
+        return path
+
+    def temp_path(self, key, suffix=''):
+        """Path where an entry can be written before being stored with put."""
+        return os.path.join(self.directory, f'.{key}.{os.getpid()}.part{suffix}')
+
+    def entries(self):
+        """List of (path, size, last access time) of the entries, least recently used first."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith('.'):
+                st = entry.stat()
+                entries.append((entry.path, st.st_size, st.st_atime))
+        return sorted(entries, key=lambda e: e[2])
+
+    @property
+    def size(self):
+        return sum(e[1] for e in self.entries())
+
+    def evict(self, keep=None):
+        """Remove the least recently used entries until the cache fits in max_bytes.
+
+        Args:
+            keep (str, optional): Path of an entry that must not be removed. Defaults to None.
+        """
+        if self.max_bytes is None:
+            return
+        entries = self.entries()
+        total = sum(e[1] for e in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats['evictions'] += 1
+
+    def report(self):
+        """One line summary of the cache usage."""
+        lookups = self.stats['hits'] + self.stats['misses']
+        rate = self.stats['hits'] / lookups if lookups > 0 else 0
+        return (f"{self.stats['hits']} hits, {self.stats['misses']} misses ({rate:.0%} hit rate), "
+                f"{self.stats['writes']} writes, {self.stats['evictions']} evictions, "
+                f"{self.size / 1024**2:.1f} MB in {self.directory}")
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+import pandas as pd
+from .core import Star
+
+
+class StarCollection:
+    def __init__(self, names, max_workers=8, astrometric_table=None, verbose=False, **star_kwargs):
+        """A collection of stars loaded concurrently. The RV, Gaia/SIMBAD and secular correction
+        lookups are mostly network bound, so the Star objects are built with a bounded thread pool.
+
+        Args:
+            names (list): Names of the targets.
+            max_workers (int, optional): Maximum number of stars loaded at the same time. Defaults to 8.
+            astrometric_table (pd.DataFrame, optional): Astrometry already known for (some of) the stars,
+                in the format accepted by utils.get_astrometric_data. Defaults to None.
+            verbose (bool, optional): Passed to each Star. Defaults to False.
+            **star_kwargs: Any other argument accepted by Star (instrument, max_erv, use_cache...).
+        """
+        self.names = list(dict.fromkeys(names))
+        self.max_workers = max_workers
+        self.verbose = verbose
+        self.star_kwargs = star_kwargs
+        self.astrometry = astrometric_table
+        self.stars = {}
+        self.failures = {}
+        self.timings = {}
+        self.wall_time = None
+        self._ids = {}
+
+    def _map(self, func, names):
+        """Run func on each name in the thread pool, returning the results and the failures."""
+        results, failures = {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(func, name): name for name in names}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    failures[name] = f"{type(e).__name__}: {e}"
+        return results, failures
+
+    def resolve_ids(self):
+        """Resolve the SIMBAD identifiers of all the stars, shared with the Star objects."""
+        from .simbad import get_ids
+
+        missing = [name for name in self.names if name not in self._ids]
+        results, _ = self._map(get_ids, missing)
+        self._ids.update(
+            {name: ids for name, ids in results.items() if ids is not None})
+        for name, star in self.stars.items():
+            star._ids = self._ids.get(name, star._ids)
+        return self._ids
+
+    def resolve_astrometry(self):
+        """Resolve the proper motions and parallaxes of all the stars at once (one SIMBAD and one
+        Gaia query), so that the secular acceleration correction of each star does not query
+        Gaia/SIMBAD again.
+
+        Returns:
+            pd.DataFrame: The astrometric table (name, pmra, pmdec, plx_value, source).
+        """
+        from .astrometry import prefetch_astrometry
+
+        known = set()
+        if self.astrometry is not None and 'name' in self.astrometry.columns:
+            known = set(self.astrometry['name'])
+        missing = [name for name in self.names if name not in known]
+        if len(missing) == 0:
+            return self.astrometry
+        try:
+            new_table = prefetch_astrometry(
+                missing, use_cache=self.star_kwargs.get('use_cache', False), verbose=self.verbose)
+        except Exception as e:
+            print(f"[WARN] Could not resolve the astrometry in bulk: {e}")
+            return self.astrometry
+        if self.astrometry is None:
+            self.astrometry = new_table
+        else:
+            # rows of a user table without a source are SIMBAD values, as in get_astrometric_data
+            known_table = self.astrometry.copy()
+            known_table['source'] = known_table['source'].fillna('simbad') \
+                if 'source' in known_table.columns else 'simbad'
+            self.astrometry = pd.concat([known_table, new_table], ignore_index=True)
+        return self.astrometry
+
+    def _load_star(self, name):
+        start = time.perf_counter()
+        try:
+            star = Star(name, simbad_table=self.astrometry,
+                        verbose=self.verbose, **self.star_kwargs)
+            star._ids = self._ids.get(name)
+        finally:
+            self.timings[name] = time.perf_counter() - start
+        return star
+
+    def load(self):
+        """Resolve the identifiers (and the astrometry if the secular correction is applied) of all
+        the stars, then build the Star objects. A failing star is reported in self.failures and does
+        not abort the batch.
+
+        Returns:
+            StarCollection: self.
+        """
+        start = time.perf_counter()
+        self.resolve_ids()
+        if self.star_kwargs.get('do_secular_corr', True):
+            self.resolve_astrometry()
+        missing = [name for name in self.names if name not in self.stars]
+        stars, failures = self._map(self._load_star, missing)
+        self.stars.update(stars)
+        self.failures.update(failures)
+        for name in stars:
+            self.failures.pop(name, None)
+        self.wall_time = time.perf_counter() - start
+        if self.verbose or len(failures) > 0:
+            for name, err in failures.items():
+                print(f"[WARN] Could not load {name}: {err}")
+            print(
+                f"[INFO] Loaded {len(stars)}/{len(missing)} stars in {self.wall_time:.1f} s.")
+        return self
+
+    @property
+    def stats(self):
+        """Throughput statistics of the last load."""
+        timings = pd.Series(self.timings, dtype=float)
+        return {
+            'n_stars': len(self.names),
+            'n_loaded': len(self.stars),
+            'n_failed': len(self.failures),
+            'wall_time': self.wall_time,
+            'stars_per_second': len(self.timings) / self.wall_time if self.wall_time else None,
+            'mean_star_time': timings.mean() if len(timings) > 0 else None,
+            'max_star_time': timings.max() if len(timings) > 0 else None,
+        }
+
+    def __getitem__(self, name):
+        return self.stars[name]
+
+    def __iter__(self):
+        return iter(self.stars[name] for name in self.names if name in self.stars)
+
+    def __len__(self):
+        return len(self.stars)
@@ -1,3 +1,5 @@
+import os
+
 accepted_pipelines = {
     'CORALIE98': ['3.3'],
     'CORALIE07': ['3.4'],
@@ -37,3 +39,9 @@ exclude_cols_bin_by_night = [
     'airmass',
     'continuum'
 ]
+# Local cache used to avoid re-querying remote services (DACE, Gaia, MAST...)
+cache_dir = os.environ.get(
+    'WARP_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'warp'))
+dace_cache_ttl = 24 * 3600  # seconds before a cached DACE time series is refreshed
+tess_cache_max_bytes = 20 * 1024**3  # size of the local TESScut cache before LRU eviction
+tess_listing_cache_ttl = 7 * 24 * 3600  # seconds before MAST/TESScut listings are refreshed
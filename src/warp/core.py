@@ -8,7 +8,8 @@ import numpy as np
 class Star:
     def __init__(self, name=None, instrument=None, load_rv=True, load_tess=False, max_erv=30,
                  do_adjust_means=True, do_secular_corr=True, skip_ndrs=False, keep_bad_qc=False, verbose=True,
-                 latest_pipeline=True, filter_columns=True, remove_negative_erv=True, set_ndrs_as_ins=True, simbad_table=None):
+                 latest_pipeline=True, filter_columns=True, remove_negative_erv=True, set_ndrs_as_ins=True, simbad_table=None,
+                 use_cache=False):
         """A class instance representing a star. This object allows to download, visualize and analyse RV and 
         photometric data.
 
@@ -27,6 +28,9 @@ class Star:
             filter_columns (bool, optional): If true, the columns for the RV data obtained from DACE are filtered in order to keep only relevant data. Defaults to True.
             remove_negative_erv (bool, optional): If true, points with a negative RV uncertainty are discarded. Defaults to True.
             simbad_table (pd.DataFrame, optional): A DataFrame containing Simbad data for the star. Defaults to None.
+            use_cache (bool, optional): If true, the DACE time series and the astrometry used for the secular
+                correction are stored in and read from the local cache (see config.cache_dir), only new RV
+                points being downloaded on refresh. Defaults to False.
         """
         self.name = name
         self.instrument = instrument
@@ -36,10 +40,21 @@ class Star:
         self.skip_ndrs = skip_ndrs
         self.keep_bad_qc = keep_bad_qc
         self.did_adjust_means = False
+        self.mean_offsets = None
         self.did_secular_corr = False
         self.set_ndrs_as_ins = set_ndrs_as_ins
-        self.bad_points = pd.DataFrame()
+        self._raw_data = None
+        self._rejection_flags = np.zeros(0, dtype=np.int64)
+        self.rejection_reasons = {}
+        self._archived_bad_points = pd.DataFrame()
+        self._rv_view = None
+        self._view_dirty = False
+        self._kept = None
+        self._data_version = 0
+        self._cache = {}
+        self._cache_version = 0
         self.simbad_table = simbad_table
+        self.use_cache = use_cache
         if name is not None and load_rv:
             self.load_rv(filter_columns=filter_columns,
                          latest_pipeline=latest_pipeline,
@@ -66,13 +81,15 @@ class Star:
         if (self.do_secular_corr):
             if verbose:
                 print("[INFO] Applying secular acceleration correction...")
-            self.rv_data['rv'] = apply_secular_correction(
+            self._raw_data['rv'] = apply_secular_correction(
                 self.name,
-                self.rv_data['rjd'],
-                self.rv_data['rv'],
+                self._raw_data['rjd'],
+                self._raw_data['rv'],
                 verbose=verbose,
-                astrometric_table=self.simbad_table
+                astrometric_table=self.simbad_table,
+                use_cache=self.use_cache
             )
+            self._invalidate_rv_data()
         self.do_filtering(filter_columns=filter_columns,
                           filter_pipeline=filter_pipeline,
                           remove_negative_erv=remove_negative_erv, verbose=verbose,
@@ -89,7 +106,8 @@ class Star:
             do_secular_corr=self.do_secular_corr,
             skip_ndrs=skip_ndrs,
             latest_pipeline=latest_pipeline,
-            verbose=verbose
+            verbose=verbose,
+            use_cache=self.use_cache
         )
         self.rv_data = self.rv_data.sort_values(by='rjd')
         self.do_filtering(filter_columns=filter_columns,
@@ -106,14 +124,16 @@ class Star:
         # if filter_pipeline:
         #     self.filter_pipeline(
         #         verbose=verbose, skip_ndrs=skip_ndrs, set_ndrs_as_ins=self.set_ndrs_as_ins)
+        self._sync_rv_view()
+        raw = self._raw_data
         if not self.keep_bad_qc:
-            self.remove_condition(self.rv_data.drs_qc == False,
-                                  origin='drs_qc', verbose=verbose, adjust_means=False)
-        self.remove_condition(self.rv_data.rv_err > self.max_erv,
-                              origin=f"rv_err_gt_{self.max_erv}", verbose=verbose, adjust_means=False)
+            self._reject(raw.drs_qc == False,
+                         origin='drs_qc', verbose=verbose)
+        self._reject(raw.rv_err > self.max_erv,
+                     origin=f"rv_err_gt_{self.max_erv}", verbose=verbose)
         if remove_negative_erv:
-            self.remove_condition(self.rv_data.rv_err <= 0,
-                                  origin='negative_rv_err', verbose=verbose, adjust_means=False)
+            self._reject(raw.rv_err <= 0,
+                         origin='negative_rv_err', verbose=verbose)
         return
 
     # def filter_pipeline(self, verbose=True, skip_ndrs=True, set_ndrs_as_ins=True):
@@ -139,9 +159,11 @@ class Star:
 
     def filter_columns(self):
         from .config import ignored_cols
-        kept_cols = [col for col in self.rv_data.columns if
+        self._sync_rv_view()
+        kept_cols = [col for col in self._raw_data.columns if
                      not any(c in col for c in ignored_cols)]
-        self.rv_data = self.rv_data[kept_cols].copy()
+        self._raw_data = self._raw_data[kept_cols].copy()
+        self._invalidate_rv_data()
         return
 
     def compute_periodogram(self, min_period=None, max_period=None):
@@ -165,13 +187,47 @@ class Star:
             return None
         min_freq = 1 / max_period if max_period is not None else None
         max_freq = 1 / min_period if min_period is not None else None
-        freq, power, best_period, fap, power_threshold = gls_periodogram(self.t,
-                                                                         self.rv,
-                                                                         self.rv_err,
-                                                                         min_freq=min_freq,
-                                                                         max_freq=max_freq)
+        freq, power, best_period, fap, power_threshold = self._memoize(
+            ('periodogram', min_freq, max_freq),
+            lambda: gls_periodogram(self.t,
+                                    self.rv,
+                                    self.rv_err,
+                                    min_freq=min_freq,
+                                    max_freq=max_freq))
         return freq, power, best_period, fap, power_threshold
 
+    def compute_periodograms(self, series=('rv', 'ccf_fwhm', 'ccf_bispan', 'ccf_contrast'),
+                             min_period=None, max_period=None, samples_per_peak=10):
+        """Computes the periodograms of several series (RV and activity indicators) in one pass.
+
+        Args:
+            series (tuple, optional): The columns of rv_data to analyse. Missing columns are skipped.
+            min_period (float, optional): The minimum period in days. Defaults to None.
+            max_period (float, optional): The maximum period in days. Defaults to None.
+            samples_per_peak (float, optional): Oversampling of the frequency grid. Defaults to 10.
+
+        Returns:
+            Tuple: (periodograms, summary), see tseries.gls_periodograms.
+        """
+        from .tseries import gls_periodograms
+
+        if self.rv_data is None:
+            print("[WARN] No RV data loaded, cannot compute periodograms.")
+            return None
+        series = [s for s in series if s in self.rv_data.columns]
+        min_freq = 1 / max_period if max_period is not None else None
+        max_freq = 1 / min_period if min_period is not None else None
+        return self._memoize(
+            ('periodograms', tuple(series), min_freq, max_freq, samples_per_peak),
+            lambda: gls_periodograms(
+                self.t,
+                {s: self.rv_data[s] for s in series},
+                {s: self.rv_data[f'{s}_err']
+                    for s in series if f'{s}_err' in self.rv_data.columns},
+                min_freq=min_freq,
+                max_freq=max_freq,
+                samples_per_peak=samples_per_peak))
+
     def load_hip_photometry(self):
         from .hipparcos import get_hip_id, query_hip_photometry
 
@@ -199,7 +255,7 @@ class Star:
         return query_kervella_table(self.hip.replace("HIP ", ""))
 
     def clip_rv(self, threshold=5, n_iter=3, groups='instrument_name', ins_list=None, verbose=True, adjust_means=True, inplace=True):
-        if not hasattr(self, 'rv_data'):
+        if self.rv_data is None:
             print("[WARN] No RV data loaded, cannot perform MAD clipping.")
             return
         mask = mad_clip_mask(
@@ -215,26 +271,59 @@ class Star:
 
     def adjust_means(self, verbose=True, ins_list=None,
                      series=('rv', 'ccf_bispan', 'ccf_fwhm', 'ccf_contrast')):
+        """Subtract the weighted mean of each series for every (instrument, DRS, extraction) group.
 
-        df = self.rv_data if ins_list is None else \
-            self.rv_data[self.rv_data.instrument_name.isin(ins_list)]
+        Args:
+            verbose (bool, optional): Defaults to True.
+            ins_list (list, optional): Instruments to adjust. Defaults to None (all of them).
+            series (tuple, optional): Series to adjust, each needing a '{series}_err' column.
 
-        groups = list(df.groupby(
-            ['instrument_name', 'drs_id', 'rv_extraction_method']
-        ))
+        Returns:
+            pd.DataFrame: The subtracted offsets, indexed by (instrument_name, drs_id, rv_extraction_method)
+                          with one column per series. They can be reapplied with apply_offsets.
+        """
+        from .stats import grouped_weighted_mean
 
-        for s in series:
-            for (ins, drs, ext), g in groups:
-                mean, _ = weighted_mean(g[s], g[f'{s}_err'])
-                self.rv_data.loc[g.index, s] -= mean
+        df = self.rv_data if ins_list is None else \
+            self.rv_data[self.rv_data.instrument_name.isin(ins_list)]
+        offsets, _ = grouped_weighted_mean(
+            df, list(series), ['instrument_name', 'drs_id', 'rv_extraction_method'])
+        self.apply_offsets(offsets)
 
-                if verbose:
+        if verbose:
+            for s in series:
+                for (ins, drs, ext), mean in offsets[s].items():
                     print(
                         f"[INFO] Adjusted mean {s} for {ins} "
                         f"(DRS {drs}, extraction {ext}) by {mean:.3f}"
                     )
-
+        self.mean_offsets = offsets if self.mean_offsets is None else \
+            self.mean_offsets.add(offsets, fill_value=0)
         self.did_adjust_means = True
+        return offsets
+
+    def apply_offsets(self, offsets):
+        """Subtract per-group offsets from the RV data, e.g. the table returned by adjust_means or
+        the cumulated mean_offsets of another Star. Rejected points are shifted as well, so that
+        they stay consistent with the kept ones if they are restored.
+
+        Args:
+            offsets (pd.DataFrame): Offsets indexed by the group columns, one column per series.
+        """
+        self._sync_rv_view()
+        raw = self._raw_data
+        keys = list(offsets.index.names)
+        cols = [c for c in offsets.columns if c in raw.columns]
+        per_row = offsets[cols].reindex(
+            pd.MultiIndex.from_frame(raw[keys]) if len(keys) > 1
+            else pd.Index(raw[keys[0]])).fillna(0).to_numpy()
+        raw[cols] = raw[cols].to_numpy(dtype=float) - per_row
+        if self._rv_view is not None:
+            self._rv_view[cols] = self._rv_view[cols].to_numpy(
+                dtype=float) - per_row[self._kept]
+        self._data_version += 1
+        return
+
     # def adjust_means(self, verbose=True, ins_list=None, series=None):
     #     if series is None:
     #         series = ['rv',
@@ -263,38 +352,165 @@ class Star:
         """
         Remove rows from rv_data based on a boolean condition.
 
+        The rows are not copied: they are flagged in the rejection ledger with the bit of their
+        origin, and can be put back with restore_points.
+
         Parameters
         ----------
         condition : array-like of bool
-            True for rows to remove.
+            True for rows to remove, aligned with rv_data.
         origin : str
-            Reason string to store in bad_points['reason'].
+            Reason string to store in bad_points['origin'].
         """
+        self._sync_rv_view()
+        condition = np.asarray(condition, dtype=bool)
         if condition.sum() == 0:
             if verbose:
                 print(f"[INFO] No points to remove for reason: {origin}")
             return
 
         # ensure boolean mask length matches
-        if len(condition) != len(self.rv_data):
+        if len(condition) != self.n_points:
             raise ValueError(
                 "Condition mask length does not match rv_data length.")
 
-        # extract rows to remove
-        removed = self.rv_data[condition].copy()
-        removed["origin"] = origin
         if verbose:
-            n_removed = len(removed)
             print(
-                f"[INFO] Removing {n_removed} points from rv_data for reason: {origin}")
-        # append to bad_points
-        self.bad_points = pd.concat(
-            [self.bad_points, removed], ignore_index=True)
+                f"[INFO] Removing {condition.sum()} points from rv_data for reason: {origin}")
+        self._rejection_flags[self._kept_positions()[condition]] |= self._reason_bit(
+            origin)
+        self._invalidate_rv_data()
+        if adjust_means:
+            self.adjust_means(verbose=verbose)
+
+    def _reject(self, condition, origin, verbose=True):
+        """Flag the rows of the raw table matching condition (aligned with the raw table)."""
+        self._sync_rv_view()
+        condition = np.asarray(condition, dtype=bool)
+        n_new = np.sum(condition & (self._rejection_flags == 0))
+        if n_new == 0:
+            if verbose:
+                print(f"[INFO] No points to remove for reason: {origin}")
+        elif verbose:
+            print(
+                f"[INFO] Removing {n_new} points from rv_data for reason: {origin}")
+        if condition.any():
+            self._rejection_flags[condition] |= self._reason_bit(origin)
+            self._invalidate_rv_data()
+        return
+
+    def _reason_bit(self, origin):
+        if origin not in self.rejection_reasons:
+            used = set(self.rejection_reasons.values())
+            free = [1 << i for i in range(63) if 1 << i not in used]
+            if len(free) == 0:
+                raise ValueError("Too many distinct rejection reasons (max 63).")
+            self.rejection_reasons[origin] = free[0]
+        return self.rejection_reasons[origin]
+
+    def _sync_rv_view(self):
+        """Write the view handed out by rv_data back to the raw table (edited values, added or
+        deleted columns), so that in-place edits are kept when rv_data is derived again. Nothing
+        is done if rv_data was not accessed since the last write-back."""
+        view = self._rv_view
+        if not self._view_dirty or view is None or self._raw_data is None:
+            return
+        self._view_dirty = False
+        raw = self._raw_data
+        kept = self._kept_positions()
+        if len(view) != len(kept):
+            raise ValueError(
+                "Rows cannot be added to or removed from rv_data in place: use remove_condition or "
+                "assign a new DataFrame instead.")
+        for col in [c for c in raw.columns if c not in view.columns]:
+            del raw[col]
+        for col in view.columns:
+            if col in raw.columns and raw[col].dtype == view[col].dtype \
+                    and isinstance(view[col].dtype, np.dtype):
+                column = raw[col].to_numpy(copy=True)
+                column[kept] = view[col].to_numpy()
+                raw[col] = column
+                continue
+            # new column or changed dtype: the rejected rows keep their values (NaN if new)
+            old = raw[col] if col in raw.columns else pd.Series(np.nan, index=raw.index)
+            raw[col] = pd.concat([view[col].set_axis(raw.index[kept]),
+                                  old.drop(raw.index[kept])]).sort_index()
+        self._data_version += 1
+
+    def _kept_positions(self):
+        if self._kept is None:
+            self._kept = np.flatnonzero(self._rejection_flags == 0)
+        return self._kept
+
+    def _invalidate_rv_data(self):
+        self._rv_view = None
+        self._view_dirty = False
+        self._kept = None
+        self._data_version += 1
+
+    def _memoize(self, key, compute):
+        """Return the cached result for key, computing it if rv_data changed since it was stored.
+
+        Only the data version is checked, which the rejections, restorations, offsets and the
+        rv_data setter increment: in-place edits of rv_data are taken into account from the next
+        of these operations on."""
+        if self._cache_version != self._data_version:
+            self._cache = {}
+            self._cache_version = self._data_version
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def restore_points(self, origin=None, verbose=True, adjust_means=False):
+        """Put back points previously removed for the given reason.
+
+        Args:
+            origin (str or list, optional): Rejection reason(s) to clear. Defaults to None (all of them).
+            verbose (bool, optional): Defaults to True.
+            adjust_means (bool, optional): Whether to adjust the means afterwards. Defaults to False.
+        """
+        if origin is None:
+            origin = list(self.rejection_reasons)
+        elif isinstance(origin, str):
+            origin = [origin]
+        self._sync_rv_view()
+        mask = 0
+        for o in origin:
+            mask |= self.rejection_reasons.get(o, 0)
+        before = self.n_points
+        self._rejection_flags &= ~np.int64(mask)
+        self._invalidate_rv_data()
+        if verbose:
+            print(
+                f"[INFO] Restored {self.n_points - before} points for reason(s): {origin}")
+        if adjust_means:
+            self.adjust_means(verbose=verbose)
+        return
 
-        # keep only remaining rows
-        self.rv_data = self.rv_data[~condition].reset_index(drop=True)
+    def set_max_erv(self, max_erv, verbose=True, adjust_means=False):
+        """Change the maximum RV uncertainty accepted, without downloading the data again.
+
+        Args:
+            max_erv (float): The new maximum RV uncertainty.
+            verbose (bool, optional): Defaults to True.
+            adjust_means (bool, optional): Whether to adjust the means afterwards. Defaults to False.
+        """
+        self._sync_rv_view()
+        before = self.n_points
+        old_origin = f"rv_err_gt_{self.max_erv}"
+        if old_origin in self.rejection_reasons:
+            self._rejection_flags &= ~np.int64(
+                self.rejection_reasons.pop(old_origin))
+        self.max_erv = max_erv
+        self._reject(self._raw_data.rv_err > max_erv,
+                     origin=f"rv_err_gt_{max_erv}", verbose=False)
+        self._invalidate_rv_data()
+        if verbose:
+            print(
+                f"[INFO] Set max_erv to {max_erv}: {self.n_points} points kept (previously {before}).")
         if adjust_means:
             self.adjust_means(verbose=verbose)
+        return
 
     def plot_rv(self, ax=None, fig=None, save_fig=False, show_plot=False, **kwargs):
         from .plotting import plot_rv
@@ -364,7 +580,7 @@ class Star:
                 self.remove_condition(
                     self.rv_data.instrument_name == ins, origin='single_observation', verbose=verbose, adjust_means=False)
 
-    def fit_keplerian(self, N_pla=3, n_lin=0, stellar_jitter=0, fap_threshold=1e-3, periods_init=[], fix_cor_offsets=False, fit_param=["P", "la0", "K", "sqrtesinw", "sqrtecosw"], fit_ins_jitter=False, ref_epoch=None, fit_stellar_jitter=False, verbose=True):
+    def fit_keplerian(self, N_pla=3, n_lin=0, stellar_jitter=0, fap_threshold=1e-3, periods_init=[], fix_cor_offsets=False, fit_param=["P", "la0", "K", "sqrtesinw", "sqrtecosw"], fit_ins_jitter=False, ref_epoch=None, fit_stellar_jitter=False, verbose=True, multistart=False, n_peaks=5, n_workers=None, criterion='bic'):
         from .kepmodel_wrapper import fit_keplerian
         self.rv_model = fit_keplerian(
             self.t.values,
@@ -381,7 +597,11 @@ class Star:
             fit_ins_jitter=fit_ins_jitter,
             ref_epoch=ref_epoch,
             fit_stellar_jitter=fit_stellar_jitter,
-            verbose=verbose
+            verbose=verbose,
+            multistart=multistart,
+            n_peaks=n_peaks,
+            n_workers=n_workers,
+            criterion=criterion
         )
         return self.rv_model
 
@@ -406,9 +626,13 @@ class Star:
         return fig, ax
 
     def plot_series_periodogram(self, series, ax=None, fig=None, adjust_means=True, verbose=True):
-        from .plotting import plot_series_periodogram
+        from .plotting import plot_series_periodogram, series_periodogram
+        periodogram = self._memoize(
+            ('series_periodogram', series, adjust_means),
+            lambda: series_periodogram(self.rv_data, series, adjust_means=adjust_means, verbose=verbose))
         fig, ax = plot_series_periodogram(
-            rv_data=self.rv_data, series=series, ax=ax, fig=None, adjust_means=adjust_means, verbose=verbose
+            rv_data=self.rv_data, series=series, ax=ax, fig=None, adjust_means=adjust_means, verbose=verbose,
+            periodogram=periodogram
         )
         return fig, ax
 
@@ -420,6 +644,60 @@ class Star:
     def set_lc_dir(self, lc_dir):
         self.lc_dir = lc_dir
 
+    def set_lc_store(self, lc_store):
+        """Sets the LightCurveStore (HDF5 file) the light curves are read from instead of lc_dir."""
+        self.lc_store = lc_store
+
+    @property
+    def rv_data(self):
+        """The kept RV points, derived from the raw table and the rejection ledger. Values and
+        columns edited in place are written back to the raw table before the next rejection,
+        restoration or offset; rows can only be removed with remove_condition (or by assigning a
+        new DataFrame, which resets the ledger)."""
+        if self._raw_data is None:
+            return None
+        if self._rv_view is None:
+            kept = self._kept_positions()
+            self._rv_view = self._raw_data.take(kept).reset_index(drop=True)
+        # the caller may edit the view in place
+        self._view_dirty = True
+        return self._rv_view
+
+    @rv_data.setter
+    def rv_data(self, rv_data):
+        if self._raw_data is not None and np.any(self._rejection_flags != 0):
+            # keep track of the points rejected before the table is replaced (e.g. by binning)
+            self._archived_bad_points = self.bad_points
+        self._rv_view = None
+        self._raw_data = None if rv_data is None else rv_data.reset_index(
+            drop=True)
+        self._rejection_flags = np.zeros(
+            0 if rv_data is None else len(rv_data), dtype=np.int64)
+        self._invalidate_rv_data()
+
+    @property
+    def raw_data(self):
+        """All the loaded RV points, including the rejected ones."""
+        return self._raw_data
+
+    @property
+    def bad_points(self):
+        """The rejected RV points, with the rejection reason(s) in the 'origin' column."""
+        if self._raw_data is None:
+            return self._archived_bad_points
+        flags = self._rejection_flags
+        rejected = np.flatnonzero(flags != 0)
+        bad = self._raw_data.take(rejected).copy()
+        origin = np.full(len(rejected), '', dtype=object)
+        for reason, bit in self.rejection_reasons.items():
+            has_bit = (flags[rejected] & bit) != 0
+            origin[has_bit] = np.where(
+                origin[has_bit] == '', reason, origin[has_bit] + ',' + reason)
+        bad['origin'] = origin
+        if len(self._archived_bad_points) == 0:
+            return bad.reset_index(drop=True)
+        return pd.concat([self._archived_bad_points, bad], ignore_index=True)
+
     @property
     def rv(self):
         return self.rv_data.rv if self.rv_data is not None else None
@@ -442,51 +720,48 @@ class Star:
 
     @property
     def n_points(self):
-        return len(self.rv_data) if self.rv_data is not None else 0
+        return len(self._kept_positions()) if self._raw_data is not None else 0
 
     @property
     def n_points_by_ins(self):
         if self.rv_data is None:
             return None
-        n_points_dict = {}
-        for ins in self.rv_data.instrument_name.unique():
-            ins_mask = self.rv_data.instrument_name == ins
-            n_points_dict[ins] = np.sum(ins_mask)
-        return n_points_dict
+        return self._memoize('n_points_by_ins', lambda: self.rv_data.groupby(
+            'instrument_name', sort=False).size().to_dict())
 
     @property
     def rms(self):
-        return np.std(self.rv) if self.rv_data is not None else None
+        if self.rv_data is None:
+            return None
+        return self._memoize('rms', lambda: np.std(self.rv))
 
     @property
     def mad(self):
         if self.rv_data is None:
             return None
-        median = np.median(self.rv)
-        mad = np.median(np.abs(self.rv - median))
-        return mad
+
+        def _mad():
+            median = np.median(self.rv)
+            return np.median(np.abs(self.rv - median))
+        return self._memoize('mad', _mad)
 
     @property
     def mad_by_ins(self):
         if self.rv_data is None:
             return None
-        mad_dict = {}
-        for ins in self.rv_data.instrument_name.unique():
-            ins_mask = self.rv_data.instrument_name == ins
-            median = np.median(self.rv[ins_mask])
-            mad = np.median(np.abs(self.rv[ins_mask] - median))
-            mad_dict[ins] = mad
-        return mad_dict
+
+        def _mad_by_ins():
+            by_ins = self.rv.groupby(self.ins, sort=False)
+            abs_dev = (self.rv - by_ins.transform('median')).abs()
+            return abs_dev.groupby(self.ins, sort=False).median().to_dict()
+        return self._memoize('mad_by_ins', _mad_by_ins)
 
     @property
     def rms_by_ins(self):
         if self.rv_data is None:
             return None
-        rms_dict = {}
-        for ins in self.rv_data.instrument_name.unique():
-            ins_mask = self.rv_data.instrument_name == ins
-            rms_dict[ins] = np.std(self.rv[ins_mask])
-        return rms_dict
+        return self._memoize('rms_by_ins', lambda: self.rv.groupby(
+            self.ins, sort=False).std(ddof=0).to_dict())
 
     @property
     def tspan(self):
@@ -498,7 +773,9 @@ class Star:
 
     @property
     def wmean(self):
-        return weighted_mean(self.rv, self.rv_err)[0] if self.rv_data is not None else None
+        if self.rv_data is None:
+            return None
+        return self._memoize('wmean', lambda: weighted_mean(self.rv, self.rv_err)[0])
 
     @property
     def median(self):
@@ -530,7 +807,13 @@ class Star:
 
     @property
     def avlb_lightcurves(self):
+        """Available light curves of the star: keys (star/sector/provenance/kind) in the light curve
+        store if one was set with set_lc_store, otherwise FITS files in lc_dir."""
         from glob import glob
+        if getattr(self, 'lc_store', None) is not None:
+            from .lcstore import LightCurveStore
+            with LightCurveStore(self.lc_store, mode='r') as store:
+                return store.keys(star=self.name)
         if not hasattr(self, 'lc_dir'):
             print(
                 "[WARN] No lc_dir specified, using data/ by default. You can set it using the set_lc_dir method.")
@@ -5,8 +5,6 @@ import numpy as np
 from dace_query.spectroscopy import Spectroscopy
 from .utils import apply_secular_correction
 
-import os
-
 
 def download_files(file_list, file_type='all', save_dir='', extract=True, verbose=True):
     """_summary_
@@ -42,16 +40,126 @@ def download_files(file_list, file_type='all', save_dir='', extract=True, verbos
     os.remove(os.path.join(save_dir, 'spectroscopy_download.tar.gz'))
 
 
+def _query_timeseries(client, target, filters, drs_version, verbose=True):
+    """Query the DACE time series of a target, using the telluric-corrected RVs for NIRPS."""
+    import pandas as pd
+
+    results = client.get_timeseries(
+        target=target,
+        filters=filters,
+        output_format='pandas',
+        sorted_by_instrument=False,
+        drs_version=drs_version
+    )
+    if results is not None and len(results) > 0 and 'NIRPS' in results.instrument_name.unique():
+        from dace_query.spectroscopy import Source
+        # If NIRPS is present in the data, we have to re-query asking for telluric-corrected RVs.
+        if verbose:
+            print(
+                "[INFO] NIRPS data detected. Applying NIRPS-specific corrections...")
+        nirps_filters = dict(filters)
+        nirps_filters['instrument_name'] = {'equal': ['NIRPS']}
+        nirps_results = client.get_timeseries(
+            target=target,
+            filters=nirps_filters,
+            output_format='pandas',
+            sorted_by_instrument=False,
+            drs_version=drs_version,
+            rv_sources=[Source.TELLURIC_CORRECTION]
+        )
+        results = pd.concat(
+            [results[results.instrument_name != 'NIRPS'], nirps_results], ignore_index=True)
+    return results
+
+
+def _points_cache_paths(target, instrument, drs_version, cache_dir=None):
+    from .cache import get_cache_dir, cache_key
+    key = cache_key(target, sorted(instrument)
+                    if instrument is not None else None, drs_version)
+    base = os.path.join(get_cache_dir('dace', cache_dir),
+                        f"{target.replace(' ', '')}_{key}")
+    return base + '.parquet', base + '.json'
+
+
+def load_cached_points(target, instrument=None, drs_version='latest', cache_dir=None):
+    """Load a cached DACE time series.
+
+    Args:
+        target (str): Name of the target.
+        instrument (list, optional): Instrument filter used for the query. Defaults to None.
+        drs_version (str, optional): DRS version used for the query. Defaults to 'latest'.
+        cache_dir (str, optional): Root of the cache. Defaults to config.cache_dir.
+
+    Returns:
+        Tuple: (points, meta) where points is a pd.DataFrame and meta a dict, or (None, None)
+               if nothing is cached for this key.
+    """
+    import json
+    import pandas as pd
+
+    data_path, meta_path = _points_cache_paths(
+        target, instrument, drs_version, cache_dir=cache_dir)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None, None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return pd.read_parquet(data_path), meta
+
+
+def save_cached_points(points, target, instrument=None, drs_version='latest', cache_dir=None):
+    """Store a DACE time series in the local cache (Parquet + JSON metadata)."""
+    import json
+    import time
+
+    data_path, meta_path = _points_cache_paths(
+        target, instrument, drs_version, cache_dir=cache_dir)
+    points.to_parquet(data_path, index=False)
+    meta = {
+        'target': target,
+        'instrument': instrument,
+        'drs_version': drs_version,
+        'fetched_at': time.time(),
+        'max_rjd': float(points['rjd'].max()) if len(points) > 0 else None,
+    }
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return
+
+
 def download_points(star, instrument=None, do_secular_corr=True,
-                    skip_ndrs=True, latest_pipeline=True, verbose=True):
-    from .simbad import query_simbad_oid
+                    skip_ndrs=True, latest_pipeline=True, verbose=True,
+                    use_cache=False, cache_ttl=None, cache_dir=None, client=None):
     """
     Download old and new DRS data for the specified star.
+
     Args:
-        star_name (str): Name of the star to download data for.
-    Returns:
+        star (Star): The star to download data for.
+        instrument (str or list, optional): Instruments to keep. Defaults to None.
+        do_secular_corr (bool, optional): Whether to correct the RVs for secular acceleration. Defaults to True.
+        skip_ndrs (bool, optional): Unused, kept for compatibility. Defaults to True.
+        latest_pipeline (bool, optional): Whether to only download the latest DRS version. Defaults to True.
+        verbose (bool, optional): Defaults to True.
+        use_cache (bool, optional): If true, the time series is read from / written to the local cache.
+            Once the cache is older than cache_ttl, only the points newer than the cached ones are
+            downloaded. If DACE cannot be reached, the cached points are used. The astrometry used for
+            the secular correction is also read from the local store. Defaults to False.
+        cache_ttl (float, optional): Age in seconds after which the cache is refreshed. None means
+            config.dace_cache_ttl. Defaults to None.
+        cache_dir (str, optional): Root of the cache. Defaults to config.cache_dir.
+        client (optional): The DACE client to use, must provide get_timeseries. Defaults to
+            dace_query's Spectroscopy.
 
+    Returns:
+        pd.DataFrame: The RV time series.
     """
+    import time
+    import pandas as pd
+
+    if client is None:
+        client = Spectroscopy
+    if cache_ttl is None:
+        from .config import dace_cache_ttl
+        cache_ttl = dace_cache_ttl
     if isinstance(instrument, str):
         instrument = [instrument]
     excluded_nights = ['2023-12-06',
@@ -65,31 +173,51 @@ def download_points(star, instrument=None, do_secular_corr=True,
         }
 
     drs_version = 'latest' if latest_pipeline else None
-    results = Spectroscopy.get_timeseries(
-        target=star.name,
-        filters=filters,
-        output_format='pandas',
-        sorted_by_instrument=False,
-        drs_version=drs_version
-    )
-    if 'NIRPS' in results.instrument_name.unique():
-        from dace_query.spectroscopy import Source
-        import pandas as pd
-        # If NIRPS is present in the data, we have to re-query asking for telluric-corrected RVs.
-        if verbose:
+    results, cached = None, None
+    if use_cache:
+        cached, meta = load_cached_points(
+            star.name, instrument, drs_version, cache_dir=cache_dir)
+        if cached is not None and time.time() - meta['fetched_at'] < cache_ttl:
+            if verbose:
+                print(
+                    f"[INFO] Using {len(cached)} cached points for star: {star.name}")
+            results = cached
+    if results is None:
+        try:
+            if cached is not None and len(cached) > 0:
+                # Incremental refresh: only ask DACE for the points newer than the cache
+                max_rjd = float(cached['rjd'].max())
+                new_filters = dict(filters)
+                new_filters['rjd'] = {'min': max_rjd}
+                new_points = _query_timeseries(
+                    client, star.name, new_filters, drs_version, verbose=verbose)
+                if new_points is not None and len(new_points) > 0:
+                    new_points = new_points[new_points['rjd'] > max_rjd]
+                if verbose:
+                    n_new = 0 if new_points is None else len(new_points)
+                    print(
+                        f"[INFO] Found {n_new} new points since the last download.")
+                if new_points is not None and len(new_points) > 0:
+                    results = pd.concat([cached, new_points], ignore_index=True)
+                else:
+                    results = cached
+            else:
+                results = _query_timeseries(
+                    client, star.name, filters, drs_version, verbose=verbose)
+        except Exception as e:
+            if cached is None:
+                raise
             print(
-                "[INFO] NIRPS data detected. Applying NIRPS-specific corrections...")
-        filters['instrument_name'] = {'equal': ['NIRPS']}
-        nirps_results = Spectroscopy.get_timeseries(
-            target=star.name,
-            filters=filters,
-            output_format='pandas',
-            sorted_by_instrument=False,
-            drs_version=drs_version,
-            rv_sources=[Source.TELLURIC_CORRECTION]
-        )
-        results = pd.concat(
-            [results[results.instrument_name != 'NIRPS'], nirps_results], ignore_index=True)
+                f"[WARN] Could not reach DACE ({e}), using the cached points for {star.name}.")
+            results = cached
+        else:
+            if use_cache and results is not None and len(results) > 0:
+                try:
+                    save_cached_points(results, star.name, instrument,
+                                       drs_version, cache_dir=cache_dir)
+                except Exception as e:
+                    print(
+                        f"[WARN] Could not write the DACE cache for {star.name}: {e}")
     if results is None or len(results) == 0:
         raise ValueError(f"No data found for star {star.name} in DACE.")
     results = results.copy()
@@ -101,7 +229,8 @@ def download_points(star, instrument=None, do_secular_corr=True,
             results['rjd'],
             results['rv'],
             verbose=verbose,
-            astrometric_table=getattr(star, 'simbad_table', None)
+            astrometric_table=getattr(star, 'simbad_table', None),
+            use_cache=use_cache
         )
     # results = results[~results.date_night.isin(excluded_nights)].copy()
     for ins in results.instrument_name.unique():
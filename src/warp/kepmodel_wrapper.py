@@ -1,6 +1,7 @@
 from kepmodel import rv
 from spleaf import cov, term
 import numpy as np
+import time as _time
 
 default_inst_jitter = {
     'CORALIE98': 5.0,
@@ -28,7 +29,15 @@ offsets_relative_to_cor14 = {
 
 def fit_keplerian(time, rv_data, rv_err, instruments, N_pla=3, n_lin=0, stellar_jitter=0, fap_threshold=1e-3, periods_init=[],
                   fix_cor_offsets=False, verbose=True, fit_param=["P", "la0", "K", "sqrtesinw", "sqrtecosw"], fit_ins_jitter=False,
-                  ref_epoch=None, fit_stellar_jitter=False, min_period=1.1):
+                  ref_epoch=None, fit_stellar_jitter=False, min_period=1.1, multistart=False, n_peaks=5, n_workers=None,
+                  criterion='bic'):
+    if multistart:
+        return fit_keplerian_multistart(
+            time, rv_data, rv_err, instruments, N_pla=N_pla, n_lin=n_lin, stellar_jitter=stellar_jitter,
+            fap_threshold=fap_threshold, periods_init=periods_init, fix_cor_offsets=fix_cor_offsets, verbose=verbose,
+            fit_param=fit_param, fit_ins_jitter=fit_ins_jitter, ref_epoch=ref_epoch,
+            fit_stellar_jitter=fit_stellar_jitter, min_period=min_period, n_peaks=n_peaks, n_workers=n_workers,
+            criterion=criterion)
     if isinstance(periods_init, int) or isinstance(periods_init, float):
         periods_init = [periods_init]
     instjit = {}
@@ -119,3 +128,177 @@ def fit_keplerian(time, rv_data, rv_err, instruments, N_pla=3, n_lin=0, stellar_
         rv_model.fit()
     rv_model.fit()
     return rv_model
+
+
+sidereal_day_freq = 1.0027379
+year_freq = 1 / 365.25
+
+
+def _periodogram_grid(time):
+    Pmax = 1.5*(np.max(time) - np.min(time))
+    Pmin = 1.0
+    nu0 = 2 * np.pi / Pmax
+    nfreq = 50000
+    dnu = (2 * np.pi / Pmin - nu0) / (nfreq - 1)
+    return nu0, dnu, nfreq
+
+
+def multistart_seeds(time, rv_model, n_peaks=5, min_period=1.1, aliases=True, fap_threshold=None):
+    """Candidate periods for the next planet: the highest local maxima of the residual periodogram
+    of rv_model, together with their yearly and daily aliases.
+
+    Args:
+        time (1D array): Times of the observations.
+        rv_model (rv.RvModel): Fitted model whose residual periodogram is searched.
+        n_peaks (int, optional): Number of periodogram peaks to keep. Defaults to 5.
+        min_period (float, optional): Shortest period considered. Defaults to 1.1.
+        aliases (bool, optional): Whether to add the aliases of each peak. Defaults to True.
+        fap_threshold (float, optional): Only keep the candidates whose periodogram power has a false
+            alarm probability below this threshold, the test fit_keplerian applies before adding a
+            planet. Defaults to None (no test).
+
+    Returns:
+        list: Candidate periods, without duplicates, highest peaks first.
+    """
+    nu0, dnu, nfreq = _periodogram_grid(time)
+    nu, power = rv_model.periodogram(nu0, dnu, nfreq)
+    freq = nu / (2 * np.pi)
+    is_peak = np.zeros(power.size, dtype=bool)
+    is_peak[1:-1] = (power[1:-1] > power[:-2]) & (power[1:-1] >= power[2:])
+    is_peak &= 1 / freq > min_period
+    peaks = np.flatnonzero(is_peak)
+    peaks = peaks[np.argsort(power[peaks])[::-1]]
+    # Peaks closer than the frequency resolution are side lobes of the same signal
+    resolution = 1 / (np.max(time) - np.min(time))
+    peak_freqs = []
+    for f in freq[peaks]:
+        if len(peak_freqs) == n_peaks:
+            break
+        if all(abs(f - fp) > resolution for fp in peak_freqs):
+            peak_freqs.append(f)
+    min_freq, max_freq = freq.min(), 1 / min_period
+    seeds = []
+    for f in peak_freqs:
+        candidates = [f]
+        if aliases:
+            candidates += [abs(f + sign * df) for df in (year_freq, sidereal_day_freq)
+                           for sign in (-1, 1)]
+        for fc in candidates:
+            if not min_freq <= fc <= max_freq:
+                continue
+            if any(abs(fc - 1 / p) < resolution for p in seeds):
+                continue
+            if fap_threshold is not None:
+                k = int(np.clip(np.rint((2 * np.pi * fc - nu0) / dnu), 0, nfreq - 1))
+                if rv_model.fap(power[k], nu.max()) > fap_threshold:
+                    continue
+            seeds.append(1 / fc)
+    return seeds
+
+
+def _bic(rv_model, n_obs):
+    return len(rv_model.fit_param) * np.log(n_obs) - 2 * rv_model.loglike()
+
+
+def _candidate_row(seed, rv_model, n_obs, elapsed):
+    return {'seed_period': seed, 'nkep': rv_model.nkep, 'loglike': rv_model.loglike(),
+            'bic': _bic(rv_model, n_obs), 'elapsed': elapsed, 'error': None}
+
+
+def _fit_candidate(seed, time, rv_data, rv_err, instruments, fit_kwargs):
+    start = _time.perf_counter()
+    periods_init = list(fit_kwargs['periods_init'])
+    if seed is not None:
+        periods_init.append(seed)
+    try:
+        rv_model = fit_keplerian(
+            time, rv_data, rv_err, instruments, **{**fit_kwargs, 'periods_init': periods_init})
+        return _candidate_row(seed, rv_model, len(time), _time.perf_counter() - start)
+    except Exception as e:
+        return {'seed_period': seed, 'nkep': None, 'loglike': -np.inf, 'bic': np.inf,
+                'elapsed': _time.perf_counter() - start, 'error': repr(e)}
+
+
+def fit_keplerian_multistart(time, rv_data, rv_err, instruments, N_pla=3, n_lin=0, stellar_jitter=0, fap_threshold=1e-3,
+                             periods_init=[], fix_cor_offsets=False, verbose=True,
+                             fit_param=["P", "la0", "K", "sqrtesinw", "sqrtecosw"], fit_ins_jitter=False,
+                             ref_epoch=None, fit_stellar_jitter=False, min_period=1.1, n_peaks=5, n_workers=None,
+                             criterion='bic'):
+    """Multi-start version of fit_keplerian. The first free planet is seeded from each of the n_peaks
+    highest peaks of the residual periodogram and their yearly/daily aliases that pass the same false
+    alarm probability test as fit_keplerian, the remaining planets being added greedily as in
+    fit_keplerian. The candidates are fitted in a process pool (serially if the pool cannot be used),
+    together with the plain greedy run, and the best one is refitted and returned.
+
+    Args:
+        n_peaks (int, optional): Number of periodogram peaks used as seeds. Defaults to 5.
+        n_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+            Use 1 to fit the candidates serially.
+        criterion (str, optional): 'bic' (lowest BIC) or 'loglike' (highest likelihood). Defaults to 'bic'.
+        Other arguments are the same as fit_keplerian.
+
+    Returns:
+        rv.RvModel: The best model. The table of candidates (seed period, number of keplerians,
+        log-likelihood, BIC and wall-clock time of each fit) is attached as rv_model.multistart_results.
+    """
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+    if criterion not in ('bic', 'loglike'):
+        raise ValueError(f"criterion must be 'bic' or 'loglike', got {criterion}")
+    if isinstance(periods_init, int) or isinstance(periods_init, float):
+        periods_init = [periods_init]
+    time, rv_data, rv_err = np.asarray(time), np.asarray(rv_data), np.asarray(rv_err)
+    instruments = pd.Series(np.asarray(instruments))
+    fit_kwargs = dict(N_pla=N_pla, n_lin=n_lin, stellar_jitter=stellar_jitter, fap_threshold=fap_threshold,
+                      periods_init=list(periods_init), fix_cor_offsets=fix_cor_offsets, verbose=False,
+                      fit_param=fit_param, fit_ins_jitter=fit_ins_jitter, ref_epoch=ref_epoch,
+                      fit_stellar_jitter=fit_stellar_jitter, min_period=min_period)
+    if N_pla <= len(periods_init):
+        start = _time.perf_counter()
+        rv_model = fit_keplerian(time, rv_data, rv_err, instruments, **{**fit_kwargs, 'verbose': verbose})
+        rv_model.multistart_results = pd.DataFrame(
+            [_candidate_row(None, rv_model, len(time), _time.perf_counter() - start)])
+        return rv_model
+
+    # Model with the imposed periods only, whose residuals are used to pick the seeds
+    base_model = fit_keplerian(time, rv_data, rv_err, instruments,
+                               **{**fit_kwargs, 'N_pla': len(periods_init)})
+    seeds = [None] + multistart_seeds(time, base_model, n_peaks=n_peaks, min_period=min_period,
+                                      fap_threshold=fap_threshold)
+    if verbose:
+        print(f'[INFO] Fitting {len(seeds)} multi-start candidates')
+
+    results = None
+    if n_workers != 1 and len(seeds) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [executor.submit(_fit_candidate, seed, time, rv_data, rv_err, instruments, fit_kwargs)
+                           for seed in seeds]
+                results = [future.result() for future in futures]
+        except Exception as e:
+            # the fits catch their own errors, so this is the pool itself failing (spawn, pickling...)
+            if verbose:
+                print(f"[WARN] Parallel multi-start failed ({e}), fitting the candidates serially.")
+    if results is None:
+        results = [_fit_candidate(seed, time, rv_data, rv_err, instruments, fit_kwargs) for seed in seeds]
+    results = pd.DataFrame(results)
+    if verbose:
+        for _, row in results.iterrows():
+            seed = 'greedy' if pd.isna(row.seed_period) else f'P={row.seed_period:.3f} d'
+            if isinstance(row.error, str):
+                print(f'[WARN] Candidate {seed} failed: {row.error}')
+            else:
+                print(f'[INFO] Candidate {seed}: {int(row.nkep)} keplerians, loglike={row.loglike:.2f}, '
+                      f'BIC={row.bic:.2f}, {row.elapsed:.2f} s')
+    if np.isinf(results[criterion]).all():
+        raise RuntimeError('All multi-start candidates failed')
+    best = results['bic'].idxmin() if criterion == 'bic' else results['loglike'].idxmax()
+    best_seed = results.loc[best, 'seed_period']
+    best_periods = list(periods_init) + ([] if pd.isna(best_seed) else [best_seed])
+    if verbose:
+        print(f"[INFO] Best candidate by {criterion}: "
+              f"{'greedy' if pd.isna(best_seed) else f'P={best_seed:.3f} d'}")
+    rv_model = fit_keplerian(time, rv_data, rv_err, instruments,
+                             **{**fit_kwargs, 'periods_init': best_periods, 'verbose': verbose})
+    rv_model.multistart_results = results
+    return rv_model
@@ -0,0 +1,260 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+def read_lc_fits(lc_path):
+    """Reads a TESS light curve FITS file (SPOC, QLP...) the way the nuSYD pipeline uses it: best
+    available flux column and cadences with QUALITY == 0.
+
+    Args:
+        lc_path (str): Path to the FITS file, expected in a directory named after the star
+            (e.g. .../HD1234/file.fits).
+
+    Returns:
+        dict: time, flux and flux_err arrays (flux_err may be None), and the star, sector,
+        provenance and flux_col of the light curve.
+    """
+    from astropy.io import fits
+    star = lc_path.split("/")[-2]  # assumes .../HDxxxx/file.fits
+    with fits.open(lc_path) as f:
+        hdr = f[0].header
+        dat = f[1].data
+        sector = hdr.get("SECTOR", None)
+        fname = lc_path.lower()
+        if ('QLP' in hdr.get("ORIGIN", "")):
+            provenance = "QLP"
+        elif ('spoc' in hdr.get("PROCVER", "").lower()):
+            provenance = "SPOC"
+        else:
+            if "qlp" in fname:
+                provenance = "QLP"
+            elif "spoc" in fname:
+                provenance = "SPOC"
+            else:
+                provenance = "unknown"
+        # flux selection
+        if "PDCSAP_FLUX" in dat.columns.names:
+            flux_col = "PDCSAP_FLUX"
+        elif "KSPSAP_FLUX" in dat.columns.names:
+            flux_col = "KSPSAP_FLUX"
+        elif "SAP_FLUX" in dat.columns.names:
+            flux_col = "SAP_FLUX"
+        else:
+            flux_col = None
+        lc = {'star': star, 'sector': sector,
+              'provenance': provenance, 'flux_col': flux_col}
+        if flux_col is None:
+            return lc
+        quality_mask = dat['QUALITY'] == 0
+        dat = dat[quality_mask]
+        lc['time'] = np.array(dat["TIME"], dtype=float)
+        lc['flux'] = np.array(dat[flux_col], dtype=float)
+        lc['flux_err'] = np.array(dat[flux_col + "_ERR"], dtype=float) if flux_col + \
+            "_ERR" in dat.columns.names else None
+    return lc
+
+
+class LightCurveStore:
+    """Single HDF5 file holding light curves by (star, sector, provenance, kind), provenance being
+    the pipeline or author of the light curve (SPOC, QLP, TESScut...) and kind e.g. 'corrected' or
+    'uncorrected'. Each light curve is a group star/sector/provenance/kind with time, flux and
+    optionally flux_err datasets, stored in compressed chunks, and its metadata as attributes.
+
+    Args:
+        path (str): Path to the HDF5 file.
+        mode (str, optional): h5py file mode. Defaults to 'a' (read/write, created if missing).
+        compression (str, optional): h5py compression filter ('gzip', 'lzf' or None). Uncompressed
+            datasets are stored contiguously, which allows memory-mapped reads. Defaults to 'gzip'.
+        compression_opts (int, optional): gzip level. Defaults to 4.
+        chunk_size (int, optional): Number of points per chunk of compressed datasets.
+            Defaults to 65536.
+    """
+
+    columns = ('time', 'flux', 'flux_err')
+
+    def __init__(self, path, mode='a', compression='gzip', compression_opts=4, chunk_size=65536):
+        import h5py
+        self.path = path
+        self.compression = compression
+        self.compression_opts = compression_opts if compression == 'gzip' else None
+        self.chunk_size = chunk_size
+        self._file = h5py.File(path, mode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    @staticmethod
+    def key(star, sector, kind='corrected', provenance='unknown'):
+        try:
+            sector = int(sector)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid sector {sector!r} for a light curve of {star}.") from None
+        provenance = str(provenance if provenance is not None else 'unknown').replace('/', '-')
+        return f"{str(star).replace(' ', '')}/{sector}/{provenance}/{kind}"
+
+    def __contains__(self, key):
+        return key in self._file
+
+    def write(self, star, sector, time, flux, flux_err=None, kind='corrected', provenance='unknown', **attrs):
+        """Stores a light curve, replacing any previous one with the same key.
+
+        Args:
+            star (str): Name of the star (spaces are removed, as in the lc_dir layout).
+            sector (int): TESS sector.
+            time (1D array): Times.
+            flux (1D array): Fluxes.
+            flux_err (1D array, optional): Flux uncertainties. Defaults to None.
+            kind (str, optional): Kind of light curve. Defaults to 'corrected'.
+            provenance (str, optional): Pipeline or author of the light curve. Defaults to 'unknown'.
+            **attrs: Metadata stored with the light curve (flux_col, source...).
+
+        Returns:
+            str: Key of the light curve in the store.
+        """
+        key = self.key(star, sector, kind, provenance)
+        if key in self._file:
+            del self._file[key]
+        group = self._file.create_group(key)
+        for name, values in zip(self.columns, (time, flux, flux_err)):
+            if values is None:
+                continue
+            values = np.asarray(values)
+            if self.compression is None or len(values) == 0:
+                group.create_dataset(name, data=values)
+            else:
+                group.create_dataset(name, data=values, chunks=(min(self.chunk_size, len(values)),),
+                                     compression=self.compression,
+                                     compression_opts=self.compression_opts, shuffle=True)
+        for name, value in attrs.items():
+            if value is not None:
+                group.attrs[name] = value
+        return key
+
+    def write_lightcurve(self, star, lc, sector=None, kind='corrected', provenance=None, **attrs):
+        """Stores a lightkurve LightCurve, see write.
+
+        Args:
+            star (str): Name of the star.
+            lc (lk.LightCurve): The light curve.
+            sector (int, optional): TESS sector. Defaults to the sector of the light curve.
+            kind (str, optional): Kind of light curve. Defaults to 'corrected'.
+            provenance (str, optional): Pipeline or author of the light curve. Defaults to the
+                AUTHOR of the light curve, or 'unknown'.
+            **attrs: Additional metadata.
+
+        Returns:
+            str: Key of the light curve in the store.
+        """
+        if sector is None:
+            sector = lc.meta.get('SECTOR', getattr(lc, 'sector', None))
+        if provenance is None:
+            provenance = lc.meta.get('AUTHOR', 'unknown')
+        flux_err = lc.flux_err.value if lc.flux_err is not None else None
+        return self.write(star, sector, lc.time.value, lc.flux.value, flux_err, kind=kind,
+                          provenance=provenance, **attrs)
+
+    def write_sectors(self, star, lcs):
+        """Stores the (corrected, uncorrected) light curves returned by tess.download_and_extract_lcs.
+
+        Args:
+            star (str): Name of the star.
+            lcs (list): (corrected, uncorrected) light curves, one pair per sector.
+
+        Returns:
+            list: Keys of the stored light curves.
+        """
+        keys = []
+        for corrected, uncorrected in lcs:
+            keys.append(self.write_lightcurve(star, corrected, kind='corrected', provenance='TESScut'))
+            keys.append(self.write_lightcurve(star, uncorrected, kind='uncorrected', provenance='TESScut'))
+        return keys
+
+    def import_fits(self, lc_path, star=None, kind='corrected'):
+        """Stores a TESS light curve FITS file, read with read_lc_fits.
+
+        Args:
+            lc_path (str): Path to the FITS file.
+            star (str, optional): Name of the star. Defaults to the name of the directory of the file.
+            kind (str, optional): Kind of light curve. Defaults to 'corrected'.
+
+        Returns:
+            str: Key of the light curve in the store.
+        """
+        lc = read_lc_fits(lc_path)
+        if lc['sector'] is None:
+            raise ValueError(f"No SECTOR keyword in the primary header of {lc_path}")
+        if lc['flux_col'] is None:
+            raise ValueError(f"No usable flux column found in {lc_path}")
+        return self.write(star if star is not None else lc['star'], lc['sector'], lc['time'], lc['flux'],
+                          lc['flux_err'], kind=kind, provenance=lc['provenance'], flux_col=lc['flux_col'],
+                          source=os.path.abspath(lc_path))
+
+    def _read_dataset(self, dataset, memmap):
+        if memmap and dataset.compression is None and dataset.chunks is None:
+            offset = dataset.id.get_offset()
+            if offset is not None:
+                return np.memmap(self.path, mode='r', dtype=dataset.dtype, offset=offset,
+                                 shape=dataset.shape)
+        return dataset[()]
+
+    def read(self, key, memmap=False):
+        """Reads a light curve.
+
+        Args:
+            key (str): Key of the light curve (star/sector/provenance/kind), see key and entries.
+            memmap (bool, optional): Whether to memory map the uncompressed datasets instead of
+                reading them. Defaults to False.
+
+        Returns:
+            dict: time, flux and flux_err (None if not stored) arrays and the metadata.
+        """
+        group = self._file[key]
+        lc = {name: self._read_dataset(group[name], memmap) if name in group else None
+              for name in self.columns}
+        lc.update(group.attrs)
+        star, sector, provenance, kind = key.split('/')
+        lc.update({'star': star, 'sector': int(sector), 'provenance': provenance, 'kind': kind})
+        return lc
+
+    def keys(self, star=None, kind=None, provenance=None):
+        """Keys of the stored light curves.
+
+        Args:
+            star (str, optional): Only the light curves of this star. Defaults to None.
+            kind (str, optional): Only the light curves of this kind. Defaults to None.
+            provenance (str, optional): Only the light curves of this pipeline. Defaults to None.
+
+        Returns:
+            list: Keys star/sector/provenance/kind, sorted by star and sector.
+        """
+        stars = [str(star).replace(' ', '')] if star is not None else list(self._file.keys())
+        keys = []
+        for s in stars:
+            if s not in self._file:
+                continue
+            for sector in sorted(self._file[s].keys(), key=int):
+                for p in self._file[s][sector].keys():
+                    if provenance is not None and p != provenance:
+                        continue
+                    for k in self._file[s][sector][p].keys():
+                        if kind is None or k == kind:
+                            keys.append(f'{s}/{sector}/{p}/{k}')
+        return keys
+
+    def entries(self, star=None, kind=None, provenance=None):
+        """Table of the stored light curves, with their key, star, sector, provenance, kind, number
+        of points and metadata."""
+        rows = []
+        for key in self.keys(star=star, kind=kind, provenance=provenance):
+            group = self._file[key]
+            s, sector, p, k = key.split('/')
+            rows.append({'key': key, **dict(group.attrs), 'star': s, 'sector': int(sector),
+                         'provenance': p, 'kind': k, 'n_points': group['time'].shape[0]})
+        return pd.DataFrame(rows)
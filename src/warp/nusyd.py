@@ -6,14 +6,128 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from astropy.convolution import convolve_fft, Gaussian1DKernel
-from astropy.timeseries import LombScargle
+from .tseries import fast_lomb_scargle
+from collections import OrderedDict
+import hashlib
 import time as tm
-from joblib import Parallel, delayed
+import warnings
+
+# Memory budget (bytes) of one batch of Monte Carlo realizations, see nuSYD.montecarlo
+MC_CHUNK_BYTES = 2**27
+# Number of power spectra kept in memory by nuSYD(use_psd_cache=True)
+PSD_CACHE_SIZE = 32
+_psd_cache = OrderedDict()
+
+
+def clear_psd_cache():
+    """Empties the in-memory cache of power spectra shared by the nuSYD instances."""
+    _psd_cache.clear()
+
+
+def common_frequency_grid(time_spans, oversample=10, fmax=24):
+    """Frequency grid (µHz) shared by several light curves, with the resolution of the longest one,
+    to be passed as freq_grid to nuSYD.
+
+    Args:
+        time_spans (float or array): Time spans of the light curves (days).
+        oversample (int, optional): Oversampling of the resolution 1 / time span. Defaults to 10.
+        fmax (float, optional): Highest frequency (c/d). Defaults to 24.
+
+    Returns:
+        np.array: The frequency grid, in µHz.
+    """
+    df = 1.0 / np.max(time_spans)
+    return np.arange(df, fmax, df / oversample) * 11.574
+
+
+def _convolve_rows(x, kernel, kernel_rows=None):
+    """Convolves each row of x with a centered, odd-sized kernel (or with its own kernel, one per
+    row or kernel[kernel_rows]), with one batched real FFT. Same result as convolve_fft(row, kernel)
+    with its defaults (normalized kernel, zero fill outside the array, NaNs interpolated from the
+    weighted neighbours)."""
+    from scipy import fft
+    x = np.atleast_2d(x)
+    kernel = np.asarray(kernel, dtype=float)
+    kernel = kernel / kernel.sum(axis=-1, keepdims=True)
+    n, k = x.shape[1], kernel.shape[-1]
+    nfft = fft.next_fast_len(n + k - 1, real=True)
+    kernel_fft = fft.rfft(kernel, nfft, axis=-1)
+    if kernel_rows is not None:
+        kernel_fft = kernel_fft[kernel_rows]
+    nans = np.isnan(x)
+    has_nans = nans.any()
+    if has_nans:
+        x = np.where(nans, 0., x)
+    out = fft.irfft(fft.rfft(x, nfft, axis=1) * kernel_fft,
+                    nfft, axis=1)[:, k // 2:k // 2 + n]
+    if has_nans:
+        # The weights are 1 outside of the array (zero fill) and 0 on the NaNs
+        weights = 1. - fft.irfft(fft.rfft(nans.astype(float), nfft, axis=1) * kernel_fft,
+                                 nfft, axis=1)[:, k // 2:k // 2 + n]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = out / weights
+        out[weights < 10 * np.finfo(float).eps] = 0.
+    return out
+
+
+def _gaussian_kernels(stddev):
+    """Gaussian1DKernel(stddev).array for each stddev, zero padded to a common odd size."""
+    stddev = np.atleast_1d(np.asarray(stddev, dtype=float))
+    size = np.ceil(8 * stddev).astype(int)
+    size += size % 2 == 0
+    half = size // 2
+    x = np.arange(-half.max(), half.max() + 1)
+    kernels = np.exp(-0.5 * (x / stddev[:, None]) ** 2)
+    kernels[np.abs(x) > half[:, None]] = 0.
+    return kernels
+
+
+def _half_max_widths(freq, smoothed, numax):
+    """Vectorized nuSYD._width_calc: edges (widl, widr) of the half-maximum region of each row of
+    the smoothed power around numax (scalar or one value per row), NaN where undefined."""
+    smoothed = np.atleast_2d(smoothed)
+    n_rows = smoothed.shape[0]
+    numax = np.broadcast_to(np.asarray(numax, dtype=float), (n_rows,))
+    lo = np.searchsorted(freq, 0.1 * numax, side='left')
+    hi = np.searchsorted(freq, 1.9 * numax, side='right')
+    empty = hi <= lo
+    if empty.all():
+        return np.full(n_rows, np.nan), np.full(n_rows, np.nan)
+    hi = np.where(empty, lo + 1, hi)
+    # Work on the union of the windows only
+    a, b = lo.min(), min(hi.max(), len(freq))
+    f, smt = freq[a:b], smoothed[:, a:b]
+    lo, hi = lo - a, hi - a
+    cols = np.arange(b - a)
+    in_window = (cols >= lo[:, None]) & (cols < hi[:, None])
+
+    rows = np.arange(n_rows)
+    ps_max = np.where(in_window, smt, -np.inf).max(axis=1)
+    sign = np.sign(smt - 0.5 * ps_max[:, None])
+    previous = np.roll(sign, 1, axis=1)
+    # The window is rolled on itself: its first point is compared to its last one
+    previous[rows, np.minimum(lo, b - a - 1)] = sign[rows, np.minimum(hi, b - a) - 1]
+    crossing = (previous != sign) & in_window
+
+    below = crossing & (f < numax[:, None])
+    has_below = below.any(axis=1)
+    left = np.where(below, f, -np.inf).max(axis=1)
+    has_above = (crossing & (f > numax[:, None])).any(axis=1)
+    right = np.where(crossing & (f >= numax[:, None]), f, np.inf).min(axis=1)
+    last = np.where(crossing, f, -np.inf).max(axis=1)
+
+    widl = np.where(has_below, left, np.where(has_above, last, numax))
+    widr = np.where(has_above, right, 2 * numax - widl)
+    widl = np.where(empty, np.nan, widl)
+    widr = np.where(empty, np.nan, widr)
+    return widl, widr
 
 
 class nuSYD:
     def __init__(self,  time, flux,  guess_numax=30, name="Star", lc_type="Kepler",
-                 factor=2, no_it=5, mc_iter=False,  apodized=False, plot=False):
+                 factor=2, no_it=5, mc_iter=False,  apodized=False, plot=False, use_float32=False,
+                 mc_seed=None, mc_chunk=None, mc_tol=None, mc_batch=50, verbose=True,
+                 band_limited=False, freq_grid=None, use_psd_cache=False, psd_cache_dir=None):
         """
         Parameters
         ----------
@@ -33,6 +147,30 @@ class nuSYD:
             Apply sinc correction near Nyquist if True.
         plot : bool
             Plot diagnostic figures if True.
+        use_float32 : bool
+            Compute the Lomb-Scargle FFTs in single precision if True.
+        mc_seed : int or np.random.Generator
+            Seed of the Monte Carlo realizations (random if None).
+        mc_chunk : int
+            Number of Monte Carlo realizations processed at once (set from MC_CHUNK_BYTES if None).
+        mc_tol : float
+            If set, the Monte Carlo runs by batches of mc_batch realizations and stops, at the latest
+            after mc_iter realizations, once the relative change of the error between two batches
+            is below mc_tol.
+        mc_batch : int
+            Number of realizations per batch of the adaptive Monte Carlo.
+        verbose : bool
+            Print the progress of the analysis if True.
+        band_limited : bool
+            Smooth only the band around numax used by the refinement loop if True (the smoothed
+            power is NaN outside of it).
+        freq_grid : array
+            Regular frequency grid (µHz) of the power spectrum, e.g. from common_frequency_grid.
+            Defaults to 1/T to 24 c/d oversampled 10 times, T being the time span.
+        use_psd_cache : bool
+            Reuse the power spectrum of a previous run on the same data and grid if True.
+        psd_cache_dir : str
+            Root of the cache where the power spectra are also kept on disk, if use_psd_cache.
         """
         self.time = time
         self.flux = flux
@@ -43,6 +181,17 @@ class nuSYD:
         self.apodized = apodized
         self.plot = plot
         self.mc_iter = mc_iter
+        self.use_float32 = use_float32
+        self.mc_seed = mc_seed
+        self.mc_chunk = mc_chunk
+        self.mc_tol = mc_tol
+        self.mc_batch = mc_batch
+        self.mc_iter_used = 0
+        self.verbose = verbose
+        self.band_limited = band_limited
+        self.freq_grid = freq_grid
+        self.use_psd_cache = use_psd_cache
+        self.psd_cache_dir = psd_cache_dir
         if self.lc_type == "Kepler":
             self.name = f"KIC {name}"
         elif self.lc_type == "TESS":
@@ -60,19 +209,60 @@ class nuSYD:
     # 1. Lomb-Scargle PDS
     # ------------------------------------------------------
     def _calc_lomb_scargle(self, t, y):
-        oversample = 10
-        df = 1.0 / (t.max() - t.min())
-        fmin, fmax = df, 24
-        # fmin, fmax = df, self.nyq
-        freq = np.arange(fmin, fmax, df / oversample)
-
-        model = LombScargle(t, y)
-        sc = model.power(freq, method="fast", normalization="psd")
+        if self.freq_grid is not None:
+            freq = np.asarray(self.freq_grid, dtype=float) / 11.574
+        else:
+            oversample = 10
+            df = 1.0 / (t.max() - t.min())
+            fmin, fmax = df, 24
+            # fmin, fmax = df, self.nyq
+            freq = np.arange(fmin, fmax, df / oversample)
+
+        sc = fast_lomb_scargle(t, y, freq, normalization="psd",
+                               use_float32=self.use_float32)
         fct = np.sqrt(4. / len(t))
         amp = np.sqrt(sc) * fct
 
         return freq * 11.574, amp * 1e6  # µHz, ppm
 
+    def _psd_key(self, t, y):
+        from .cache import cache_key
+        sha = hashlib.sha1()
+        for values in (t, y):
+            sha.update(np.ascontiguousarray(values, dtype=float).tobytes())
+        grid = None
+        if self.freq_grid is not None:
+            grid = (float(self.freq_grid[0]), float(self.freq_grid[-1]), len(self.freq_grid))
+        return cache_key(sha.hexdigest(), grid, self.use_float32)
+
+    def _cached_lomb_scargle(self, t, y):
+        """_calc_lomb_scargle through the in-memory (and optionally on disk) cache of power spectra,
+        keyed by a hash of the light curve and the frequency grid."""
+        if not self.use_psd_cache:
+            return self._calc_lomb_scargle(t, y)
+        key = self._psd_key(t, y)
+        if key in _psd_cache:
+            _psd_cache.move_to_end(key)
+            return _psd_cache[key]
+        file_cache = None
+        if self.psd_cache_dir is not None:
+            from .cache import FileCache
+            file_cache = FileCache('nusyd_psd', cache_dir=self.psd_cache_dir)
+            path = file_cache.get(key, suffix='.npz')
+        if file_cache is not None and path is not None:
+            with np.load(path) as f:
+                psd = f['freq'], f['amp']
+        else:
+            psd = self._calc_lomb_scargle(t, y)
+            if file_cache is not None:
+                tmp = file_cache.temp_path(key, suffix='.npz')
+                np.savez(tmp, freq=psd[0], amp=psd[1])
+                file_cache.put(key, tmp, suffix='.npz')
+        _psd_cache[key] = psd
+        while len(_psd_cache) > PSD_CACHE_SIZE:
+            _psd_cache.popitem(last=False)
+        return psd
+
     # ------------------------------------------------------
     # 2. Width calculation at half-maximum
     # ------------------------------------------------------
@@ -158,6 +348,8 @@ class nuSYD:
 
         fres = freq[1] - freq[0]
         sinc = np.sin(np.pi * freq / (2 * nyq)) / (np.pi * freq / (2 * nyq))
+        freq_sq = freq ** 2
+        above_nyq = freq >= nyq
 
         numax = guess_numax
         numaxs, powers, widths = [], [], []
@@ -180,20 +372,32 @@ class nuSYD:
             inds = np.where((freq >= wn_l) & (freq <= wn_h))
             white_noise = np.nanmean(power[inds])
 
-            # Background model
-            background = (freq / numax) ** -2
-            background[freq >= nyq] = 1e9
-
             # Power prep
             sub_power = power - white_noise
             if self.apodized and it == (self.no_it - 1):
                 sub_power /= sinc ** 2
-            divided_power = sub_power / background
-
-            # Smooth
             kernel_width = self.factor * 0.26 * numax ** 0.772
             gausk = Gaussian1DKernel(kernel_width / (2.355 * fres))
-            smoothed_power = convolve_fft(divided_power, gausk)
+
+            if self.band_limited:
+                # Background model and smoothing
+                divided_power = sub_power * freq_sq / numax ** 2
+                divided_power[above_nyq] = sub_power[above_nyq] / 1e9
+                # The peak is searched in [0.6, 1.4] numax and the width measured in [0.1, 1.9] of the
+                # new numax, so [0.06, 2.66] numax padded by half the kernel is smoothed exactly
+                half = len(gausk.array) // 2
+                band = slice(max(np.searchsorted(freq, 0.06 * numax) - half, 0),
+                             np.searchsorted(freq, 2.66 * numax, side='right') + half)
+                smoothed_power = np.full(len(freq), np.nan)
+                smoothed_power[band] = _convolve_rows(divided_power[band], gausk.array)[0]
+            else:
+                # Background model
+                background = (freq / numax) ** -2
+                background[freq >= nyq] = 1e9
+                divided_power = sub_power / background
+
+                # Smooth
+                smoothed_power = convolve_fft(divided_power, gausk)
 
             # Restrict around numax
             fmask = np.where((freq <= nyq) &
@@ -233,7 +437,8 @@ class nuSYD:
     # 6. Main pipeline runner
     # ------------------------------------------------------
     def run(self):
-        print(f"<-----Started the analysis for {self.name} ---->")
+        if self.verbose:
+            print(f"<-----Started the analysis for {self.name} ---->")
         nyq = 24 * 11.574 if self.lc_type in ["Kepler", "TESS"] else None
         # dt_sec = np.nanmedian(np.diff(self.time))*60*60*24
         # nyq = 1 / (2 * dt_sec)
@@ -242,7 +447,7 @@ class nuSYD:
             self.time)*np.median(np.diff(self.time))
 
         # PDS
-        freq, amp = self._calc_lomb_scargle(self.time, self.flux)
+        freq, amp = self._cached_lomb_scargle(self.time, self.flux)
         power = (amp ** 2) * (time_eff * 24 * 3600) / 1e6
 
         # Initial numax
@@ -254,7 +459,7 @@ class nuSYD:
         # core nuSYD
         numax, numax_uncor, ppeak, width_l, width_r, smoothed_power, divided_power = self._refine_numax(
             freq, power, self.guess_numax, nyq)
-        if np.isnan(width_r - width_l) == False:
+        if np.isnan(width_r - width_l) == False and self.verbose:
             print("Width calculation is succesful!! Bias correction can be trusted.")
 
         # Save results
@@ -268,13 +473,15 @@ class nuSYD:
         self.ppeak = ppeak
 
         if self.mc_iter:
-            print("<========= Running MC sampling ===========>")
+            if self.verbose:
+                print("<========= Running MC sampling ===========>")
             # time1 = tm.time()
             self.errors = self.montecarlo(freq, power, self.numax, nyq)
             # time2 = tm.time()
             # print("time", time2-time1)
         else:
             self.errors = np.nan
+            self.mc_iter_used = 0
 
         if self.plot:
             self._plot_results()
@@ -284,7 +491,8 @@ class nuSYD:
             "power": self.power,
             "numax": self.numax,
             "widths": self.widths,
-            "errors": self.errors
+            "errors": self.errors,
+            "mc_iter_used": self.mc_iter_used
         }
 
     # ------------------------------------------------------
@@ -327,54 +535,300 @@ class nuSYD:
     # ----------------------------------------------------------
 
     def montecarlo(self, freq, power, numax, nyq):
+        """numax uncertainty from mc_iter chi-square (2 dof) realizations of the power spectrum,
+        processed by chunks of realizations: each chunk is drawn as a 2D array and smoothed with
+        one batched FFT, and its peaks and widths are found with array operations. With mc_tol, the
+        realizations run by batches of mc_batch until the error stabilizes, see __init__; the number
+        of realizations used is kept in mc_iter_used."""
         fres = freq[1] - freq[0]
         kernel_width = self.factor * 0.26 * numax ** 0.772
-        gausk = Gaussian1DKernel(kernel_width / (2.355 * fres))
+        kernel = Gaussian1DKernel(kernel_width / (2.355 * fres)).array
 
         background = (freq / numax) ** -2
         background[freq >= nyq] = 1e9
 
-        fmask = np.where((freq <= nyq) &
-                         (freq >= 0.6 * numax) &
-                         (freq <= min(1.4 * numax, nyq)))
+        # With band_limited, only the width window [0.1, 1.9] numax padded by half the kernel is smoothed
+        band = slice(None)
+        if self.band_limited:
+            half = len(kernel) // 2
+            band = slice(max(np.searchsorted(freq, 0.1 * numax) - half, 0),
+                         np.searchsorted(freq, 1.9 * numax, side='right') + half)
+        freq_band, background = freq[band], background[band]
 
-        # Define single Monte Carlo iteration
-        def _single_mc(_):
-            new_power = (np.random.chisquare(2, len(freq)) * power) / 2
+        fmask = np.where((freq_band <= nyq) &
+                         (freq_band >= 0.6 * numax) &
+                         (freq_band <= min(1.4 * numax, nyq)))[0]
 
-            if self.lc_type == "Kepler":
-                wn_l, wn_h = (0.97 * nyq, nyq) if numax < 0.9 * \
-                    nyq else (0.68 * numax, 0.72 * numax)
-            else:
-                wn_l, wn_h = (0.91 * nyq, nyq) if numax < 0.8 * \
-                    nyq else (0.68 * numax, 0.72 * numax)
+        if self.lc_type == "Kepler":
+            wn_l, wn_h = (0.97 * nyq, nyq) if numax < 0.9 * \
+                nyq else (0.68 * numax, 0.72 * numax)
+        else:
+            wn_l, wn_h = (0.91 * nyq, nyq) if numax < 0.8 * \
+                nyq else (0.68 * numax, 0.72 * numax)
+        inds = np.where((freq >= wn_l) & (freq <= wn_h))[0]
+
+        rng = np.random.default_rng(self.mc_seed)
+        chunk = self.mc_chunk or max(1, MC_CHUNK_BYTES // (32 * (len(freq_band) + len(kernel))))
+        batch = min(self.mc_batch, self.mc_iter) if self.mc_tol else self.mc_iter
+        results = np.empty(self.mc_iter)
+        n_done, error = 0, np.nan
+        while n_done < self.mc_iter:
+            stop = min(n_done + batch, self.mc_iter)
+            for start in range(n_done, stop, chunk):
+                n = min(chunk, stop - start)
+                new_power = rng.chisquare(2, (n, len(freq))) * power / 2
+                white_noise = np.nanmean(new_power[:, inds], axis=1)
+                divided_power = (new_power[:, band] - white_noise[:, None]) / background
+                smoothed_power = _convolve_rows(divided_power, kernel)
+
+                smt_sub = smoothed_power[:, fmask]
+                numax_uncor_final = freq_band[fmask][np.argmax(smt_sub, axis=1)]
+                widl, widr = _half_max_widths(freq_band, smoothed_power, numax)
+
+                with np.errstate(invalid='ignore'):
+                    sigma_actual = 0.248 * ((widr - widl)**1.08)
+                results[start:start + n] = (numax_uncor_final**2 - 2 *
+                                            (sigma_actual)**2) / numax_uncor_final
+            n_done = stop
+
+            # Scaled by mc_iter as in a full run, so that early stopped errors are comparable
+            previous, error = error, np.nanstd(results[:n_done]) / np.sqrt(self.mc_iter)
+            if self.mc_tol and abs(error - previous) < self.mc_tol * error:
+                break
+
+        self.mc_iter_used = n_done
 
-            inds = np.where((freq >= wn_l) & (freq <= wn_h))
-            white_noise = np.nanmean(new_power[inds])
+        return error
 
-            divided_power = (new_power - white_noise) / background
 
-            smoothed_power = convolve_fft(divided_power, gausk)
+class nuSYDBatch:
+    def __init__(self, lightcurves, guess_numax="from_lc", lc_type="TESS", factor=2, no_it=5,
+                 mc_iter=False, apodized=False, freq_grid=None, use_float32=False, mc_seed=None,
+                 use_psd_cache=False, psd_cache_dir=None, verbose=True, chunk_stars=64):
+        """
+        nuSYD on many light curves at once: their power spectra are computed on a common frequency
+        grid and the refinement and Monte Carlo steps run on the (n_stars x n_freq) power matrix,
+        by chunks of rows of MC_CHUNK_BYTES.
 
-            freq_sub, smt_sub = freq[fmask], smoothed_power[fmask]
-            cc = np.argmax(smt_sub)
-            numax_uncor_final = freq_sub[cc]
+        Parameters
+        ----------
+        lightcurves : list
+            (time, flux) of each star, as for nuSYD.
+        guess_numax : float, array or "from_lc"
+            Initial guess for numax (µHz), one for all the stars or one per star.
+        freq_grid : array
+            Common frequency grid (µHz). Defaults to common_frequency_grid of the light curves.
+        mc_seed : int or np.random.Generator
+            Seed of the Monte Carlo realizations (random if None).
+        chunk_stars : int
+            Maximum number of stars refined together. The stars are sorted by numax, so smaller
+            chunks smooth narrower bands.
+
+        The other parameters are the same as for nuSYD.
+        """
+        self.lightcurves = [(np.asarray(t, dtype=float), np.asarray(f, dtype=float))
+                            for t, f in lightcurves]
+        self.guess_numax = guess_numax
+        self.lc_type = lc_type
+        self.factor = factor
+        self.no_it = no_it
+        self.mc_iter = mc_iter
+        self.apodized = apodized
+        self.freq_grid = freq_grid
+        self.use_float32 = use_float32
+        self.mc_seed = mc_seed
+        self.use_psd_cache = use_psd_cache
+        self.psd_cache_dir = psd_cache_dir
+        self.verbose = verbose
+        self.chunk_stars = chunk_stars
 
-            try:
-                widl, widr = self._width_calc(freq, smoothed_power, numax)
-            except Exception:
-                widl, widr = np.nan, np.nan
+        # results
+        self.freq = None
+        self.power = None
+        self.numax = None
+        self.numax_uncor = None
+        self.widths = None
+        self.errors = None
 
-            width_final = widr - widl
-            sigma_actual = 0.248 * (width_final**1.08)
-            numax_actual = (numax_uncor_final**2 - 2 *
-                            (sigma_actual)**2) / numax_uncor_final
+    def _psd_matrix(self):
+        if self.freq_grid is None:
+            self.freq_grid = common_frequency_grid(
+                [t.max() - t.min() for t, _ in self.lightcurves])
+        power = np.empty((len(self.lightcurves), len(self.freq_grid)))
+        for i, (t, f) in enumerate(self.lightcurves):
+            star = nuSYD(t, f, lc_type=self.lc_type, use_float32=self.use_float32,
+                         freq_grid=self.freq_grid, use_psd_cache=self.use_psd_cache,
+                         psd_cache_dir=self.psd_cache_dir, verbose=False)
+            time_eff = star._eff(t) if self.lc_type == "TESS" else len(t) * np.median(np.diff(t))
+            freq, amp = star._cached_lomb_scargle(t, f)
+            power[i] = (amp ** 2) * (time_eff * 24 * 3600) / 1e6
+        return freq, power
+
+    def _get_numax_frompds(self, freq, power, nyq):
+        # nuSYD._get_numax_frompds on each row
+        high = 0.91 if self.lc_type == "TESS" else 0.97
+        pow1 = np.nanmean(power[:, (freq >= 5) & (freq <= nyq)], axis=1)
+        pow2 = np.nanmean(power[:, (freq >= high * nyq) & (freq <= nyq)], axis=1)
+        dp = np.log10(abs(pow1 - pow2))
+        if self.lc_type == "TESS":
+            return 10 ** (-1.039 * dp + 5.1594)
+        return 10 ** (-0.115 * dp ** 2 - 0.0824 * dp + 3.08)
 
-            return numax_actual
+    def _white_noise_window(self, freq, numax, nyq):
+        # Indices [lo, hi) of the white noise region of each row, as in nuSYD._refine_numax
+        if self.lc_type == "Kepler":
+            fixed, low = numax < 0.9 * nyq, 0.97
+        else:
+            fixed, low = numax < 0.8 * nyq, 0.91
+        wn_l = np.where(fixed, low * nyq, 0.68 * numax)
+        wn_h = np.where(fixed, nyq, 0.72 * numax)
+        lo = np.searchsorted(freq, wn_l, side='left')
+        hi = np.searchsorted(freq, wn_h, side='right')
+        return lo, np.maximum(hi, lo)
+
+    def _band_columns(self, freq, numax, band):
+        # Columns of [band[0], band[1]] numax of the rows, padded by half the widest kernel
+        fres = freq[1] - freq[0]
+        stddev = self.factor * 0.26 * numax.max() ** 0.772 / (2.355 * fres)
+        half = _gaussian_kernels(stddev).shape[1] // 2
+        return slice(max(np.searchsorted(freq, band[0] * numax.min()) - half, 0),
+                     np.searchsorted(freq, band[1] * numax.max(), side='right') + half)
+
+    def _white_noise(self, freq, power, numax, nyq):
+        lo, hi = self._white_noise_window(freq, numax, nyq)
+        a, b = lo.min(), hi.max()
+        cols = np.arange(a, b)
+        in_window = (cols >= lo[:, None]) & (cols < hi[:, None])
+        with np.errstate(invalid='ignore'):
+            return np.nanmean(np.where(in_window, power[:, a:b], np.nan), axis=1)
+
+    def _smooth(self, freq, power, numax, nyq, band, sinc=None):
+        """White noise and background corrected, smoothed power of each row over the band
+        [band[0], band[1]] numax of the rows, padded by half the kernels."""
+        fres = freq[1] - freq[0]
+        white_noise = self._white_noise(freq, power, numax, nyq)
+        # One kernel per distinct numax (the Monte Carlo rows of a star share it)
+        numaxs, kernel_rows = np.unique(numax, return_inverse=True)
+        kernel_width = self.factor * 0.26 * numaxs ** 0.772
+        kernels = _gaussian_kernels(kernel_width / (2.355 * fres))
+        cols = self._band_columns(freq, numax, band)
+        freq_band = freq[cols]
+        sub_power = power[:, cols] - white_noise[:, None]
+        if sinc is not None:
+            sub_power /= sinc[cols] ** 2
+        divided_power = sub_power * freq_band ** 2 / numax[:, None] ** 2
+        divided_power[:, freq_band >= nyq] = sub_power[:, freq_band >= nyq] / 1e9
+        return freq_band, _convolve_rows(divided_power, kernels, kernel_rows)
+
+    @staticmethod
+    def _peaks(freq, smoothed, numax, nyq):
+        fmask = (freq <= nyq) & (freq >= 0.6 * numax[:, None]) & \
+            (freq <= np.minimum(1.4 * numax, nyq)[:, None])
+        cc = np.argmax(np.where(fmask, smoothed, -np.inf), axis=1)
+        found = fmask.any(axis=1)
+        ppeak = np.where(found, smoothed[np.arange(len(cc)), cc], np.nan)
+        return np.where(found, freq[cc], np.nan), ppeak
+
+    @staticmethod
+    def _bias_correction(numax, widl, widr):
+        with np.errstate(invalid='ignore'):
+            sigma_actual = 0.248 * ((widr - widl)**1.08)
+        return (numax**2 - 2 * (sigma_actual)**2) / numax
+
+    def _refine(self, freq, power, numax, nyq, sinc):
+        """nuSYD._refine_numax on the rows of power (band limited)."""
+        numax = numax.copy()
+        ppeak, widl, widr = (np.full(len(numax), np.nan) for _ in range(3))
+        for it in range(self.no_it):
+            # Rows whose peak search region is off the grid fail, as in nuSYD
+            ok = np.isfinite(numax) & (0.6 * numax <= min(freq[-1], nyq)) & (1.4 * numax >= freq[0])
+            if not ok.any():
+                break
+            apodize = sinc if self.apodized and it == (self.no_it - 1) else None
+            freq_band, smoothed = self._smooth(
+                freq, power[ok], numax[ok], nyq, (0.06, 2.66), apodize)
+            new_numax, new_ppeak = self._peaks(freq_band, smoothed, numax[ok], nyq)
+            new_widl, new_widr = _half_max_widths(freq_band, smoothed, new_numax)
+            numax[ok], numax[~ok] = new_numax, np.nan
+            ppeak, widl, widr = (np.full(len(numax), np.nan) for _ in range(3))
+            ppeak[ok], widl[ok], widr[ok] = new_ppeak, new_widl, new_widr
+        return self._bias_correction(numax, widl, widr), numax, ppeak, widl, widr
 
-        results = Parallel(n_jobs=5, backend='threading')(
-            delayed(_single_mc)(i) for i in range(self.mc_iter))
+    def montecarlo(self, freq, power, numax, nyq):
+        """nuSYD.montecarlo of all the stars: the (star, realization) pairs are processed by chunks
+        of rows, each row being smoothed with the kernel of its star over the band of its star."""
+        rng = np.random.default_rng(self.mc_seed)
+        # Stars sorted by numax, so that the rows of a chunk share a narrow band
+        valid = np.flatnonzero(np.isfinite(numax) & (numax > 0))
+        stars = np.repeat(valid[np.argsort(numax[valid])], self.mc_iter)
+        results = np.full((len(numax), self.mc_iter), np.nan)
+
+        def _chunk_size(rows):
+            # Larger chunks than a few stars only widen the band and hurt the cache
+            cols = self._band_columns(freq, numax[rows], (0.1, 1.9))
+            return min(max(self.mc_iter, 256), max(1, MC_CHUNK_BYTES // (32 * (cols.stop - cols.start))))
+
+        start = 0
+        while start < len(stars):
+            rows = stars[start:start + _chunk_size(stars[start:start + 1])]
+            rows = rows[:_chunk_size(rows)]
+            # The realizations are only drawn where they are used: band and white noise region
+            new_power = np.empty((len(rows), power.shape[1]))
+            lo, hi = self._white_noise_window(freq, numax[rows], nyq)
+            for cols in (self._band_columns(freq, numax[rows], (0.1, 1.9)), slice(lo.min(), hi.max())):
+                new_power[:, cols] = rng.chisquare(2, new_power[:, cols].shape) * power[rows, cols] / 2
+            freq_band, smoothed = self._smooth(freq, new_power, numax[rows], nyq, (0.1, 1.9))
+            numax_uncor, _ = self._peaks(freq_band, smoothed, numax[rows], nyq)
+            widl, widr = _half_max_widths(freq_band, smoothed, numax[rows])
+            index = np.arange(start, start + len(rows)) % self.mc_iter
+            results[rows, index] = self._bias_correction(numax_uncor, widl, widr)
+            start += len(rows)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.nanstd(results, axis=1) / np.sqrt(self.mc_iter)
 
-        error = np.nanstd(results) / np.sqrt(self.mc_iter)
+    def run(self):
+        if self.verbose:
+            print(f"<-----Started the analysis for {len(self.lightcurves)} stars ---->")
+        nyq = 24 * 11.574 if self.lc_type in ["Kepler", "TESS"] else None
+        freq, power = self._psd_matrix()
+        sinc = np.sin(np.pi * freq / (2 * nyq)) / (np.pi * freq / (2 * nyq))
 
-        return error
+        # Initial numax
+        if isinstance(self.guess_numax, str) and self.guess_numax == "from_lc":
+            guess_numax = self._get_numax_frompds(freq, power, nyq)
+        else:
+            guess_numax = np.broadcast_to(np.asarray(self.guess_numax, dtype=float),
+                                          (len(power),)).copy()
+        self.guess_numax = guess_numax
+
+        # core nuSYD, by chunks of stars of similar numax
+        numax, numax_uncor, ppeak, widl, widr = (np.full(len(power), np.nan) for _ in range(5))
+        chunk = min(self.chunk_stars, max(1, MC_CHUNK_BYTES // (32 * power.shape[1])))
+        order = np.argsort(guess_numax)
+        for start in range(0, len(power), chunk):
+            rows = order[start:start + chunk]
+            numax[rows], numax_uncor[rows], ppeak[rows], widl[rows], widr[rows] = self._refine(
+                freq, power[rows], guess_numax[rows], nyq, sinc)
+
+        self.freq = freq
+        self.power = power
+        self.numax = numax
+        self.numax_uncor = numax_uncor
+        self.widths = np.column_stack((widl, widr))
+        self.ppeak = ppeak
+
+        if self.mc_iter:
+            if self.verbose:
+                print("<========= Running MC sampling ===========>")
+            self.errors = self.montecarlo(freq, power, numax, nyq)
+        else:
+            self.errors = np.full(len(power), np.nan)
+
+        return {
+            "freq": self.freq,
+            "power": self.power,
+            "numax": self.numax,
+            "widths": self.widths,
+            "errors": self.errors
+        }
@@ -1,58 +1,84 @@
 from .nusyd import nuSYD
 import numpy as np
-from astropy.io import fits
+import pandas as pd
 from .tess import detrend, get_numax_init
+from .lcstore import LightCurveStore, read_lc_fits
+import hashlib
+import logging
+import os
+import time as tm
 import traceback
 
+# Columns of the checkpoint table of process_lc_files
+BATCH_COLUMNS = ['file', 'hash', 'star', 'sector', 'provenance', 'flux', 'numax', 'numax_err',
+                 'mc_iter_used', 'error', 't_read', 't_detrend', 't_nusyd']
 
-def process_lc_file(lc_path,  guess_table=None, plot=False, min_nu=None, max_nu=None):
+
+def _read_store_entry(store, key):
+    if isinstance(store, LightCurveStore):
+        return store.read(key)
+    with LightCurveStore(store, mode='r') as lc_store:
+        return lc_store.read(key)
+
+
+def _guess_index(guess_table):
+    """Index {star: numax_guess} of a guess table with the HD and numax_guess columns, keeping the
+    first guess of each star."""
+    if guess_table is None or isinstance(guess_table, dict):
+        return guess_table
+    first = guess_table.drop_duplicates(subset='HD', keep='first')
+    return dict(zip(first['HD'], first['numax_guess']))
+
+
+def process_lc_file(lc_path,  guess_table=None, plot=False, min_nu=None, max_nu=None, store=None,
+                    mc_iter=200, mc_tol=None, band_limited=False, verbose=True):
+    """Runs nuSYD on a light curve.
+
+    Args:
+        lc_path (str): Path to a TESS light curve FITS file, or key (star/sector/provenance/kind) of
+            a light curve in store.
+        guess_table (pd.DataFrame or dict, optional): Table with the HD and numax_guess columns, or
+            a {star: numax_guess} dict. Defaults to None.
+        plot (bool, optional): Whether to plot the nuSYD results. Defaults to False.
+        store (str or LightCurveStore, optional): Light curve store to read lc_path from. Defaults to None.
+        mc_iter (int, optional): Maximum number of Monte Carlo realizations. Defaults to 200.
+        mc_tol (float, optional): Tolerance of the adaptive Monte Carlo, see nuSYD. Defaults to None.
+        band_limited (bool, optional): Whether to smooth only the band around numax, see nuSYD.
+            Defaults to False.
+        verbose (bool, optional): Whether to print verbose output. Defaults to True.
+
+    Returns:
+        dict: file, star, sector, provenance, numax, numax_err and flux column, or the error, and
+        the time spent reading, detrending and running nuSYD (t_read, t_detrend, t_nusyd).
+    """
+    star = sector = provenance = flux_col = None
+    timings = {}
     try:
-        f = fits.open(lc_path)
-        hdr = f[0].header
-        dat = f[1].data
-        star = lc_path.split("/")[-2]  # assumes .../HDxxxx/file.fits
-        sector = hdr.get("SECTOR", None)
-        fname = lc_path.lower()
-        if ('QLP' in hdr.get("ORIGIN", "")):
-            provenance = "QLP"
-        elif ('spoc' in hdr.get("PROCVER", "").lower()):
-            provenance = "SPOC"
+        t0 = tm.perf_counter()
+        if store is not None:
+            lc = _read_store_entry(store, lc_path)
         else:
-            if "qlp" in fname:
-                provenance = "QLP"
-            elif "spoc" in fname:
-                provenance = "SPOC"
-            else:
-                provenance = "unknown"
-        # -------------------------
-        # flux selection
-        # -------------------------
-        if "PDCSAP_FLUX" in dat.columns.names:
-            flux_col = "PDCSAP_FLUX"
-        elif "KSPSAP_FLUX" in dat.columns.names:
-            flux_col = "KSPSAP_FLUX"
-        elif "SAP_FLUX" in dat.columns.names:
-            flux_col = "SAP_FLUX"
-        else:
-            flux_col = None
+            lc = read_lc_fits(lc_path)
+        star, sector = lc['star'], lc['sector']
+        provenance, flux_col = lc.get('provenance', 'unknown'), lc.get('flux_col', None)
+        if lc.get('time') is None:
             raise ValueError("No usable flux column found")
-        quality_mask = dat['QUALITY'] == 0
-        dat = dat[quality_mask]
-        time = dat["TIME"]
-        flux = dat[flux_col]
-        flux_err = dat[flux_col + "_ERR"] if flux_col + \
-            "_ERR" in dat.columns.names else None
+        time, flux, flux_err = lc['time'], lc['flux'], lc['flux_err']
+        t1 = tm.perf_counter()
+        timings['t_read'] = t1 - t0
 
         time, flux, trend_full = detrend(
-            time, flux, flux_err, return_trend=True, smooth_days=2)
+            time, flux, flux_err, return_trend=True, smooth_days=2, verbose=verbose)
         # flux = (flux - np.nanmedian(flux)) / np.nanmedian(flux)
+        t2 = tm.perf_counter()
+        timings['t_detrend'] = t2 - t1
 
         # -------------------------
         # if guess_table == 'custom':
         #     guess_nu, freq, power, smooth = get_numax_init(time*24*60*60, flux)
-        if guess_table is not None:
-            guess_nu = guess_table[guess_table.HD ==
-                                   star].numax_guess.values[0] if star in guess_table["HD"].tolist() else "from_lc"
+        guesses = _guess_index(guess_table)
+        if guesses is not None:
+            guess_nu = guesses.get(star, "from_lc")
         else:
             guess_nu = "from_lc"
         # run nuSYD
@@ -60,14 +86,17 @@ def process_lc_file(lc_path,  guess_table=None, plot=False, min_nu=None, max_nu=
         runner = nuSYD(
             time,
             flux,
-            mc_iter=200,
+            mc_iter=mc_iter,
+            mc_tol=mc_tol,
             lc_type="TESS",
             guess_numax=guess_nu,
-            plot=plot
+            plot=plot,
+            verbose=verbose,
+            band_limited=band_limited
         )
 
         results = runner.run()
-        f.close()
+        timings['t_nusyd'] = tm.perf_counter() - t2
 
         return {
             "file": lc_path,
@@ -76,17 +105,141 @@ def process_lc_file(lc_path,  guess_table=None, plot=False, min_nu=None, max_nu=
             "provenance": provenance,
             "numax": results.get("numax", np.nan),
             "numax_err": results.get("errors", np.nan),
-            'flux': flux_col
+            "mc_iter_used": results.get("mc_iter_used", 0),
+            'flux': flux_col,
+            **timings
         }
 
     except Exception as e:
-        print(e)
-        traceback.print_exc()
+        if verbose:
+            print(e)
+            traceback.print_exc()
         return {
             "file": lc_path,
             "error": str(e),
             'star': star,
             'sector': sector,
             'provenance': provenance,
-            'flux': flux_col
+            'flux': flux_col,
+            **timings
         }
+
+
+def content_hash(lc_path, store=None):
+    """SHA-1 of the content of a light curve file, or of the data of a light curve in store."""
+    sha = hashlib.sha1()
+    if store is not None:
+        lc = _read_store_entry(store, lc_path)
+        for name in LightCurveStore.columns:
+            if lc[name] is not None:
+                sha.update(np.ascontiguousarray(lc[name]).tobytes())
+        return sha.hexdigest()
+    with open(lc_path, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+# {star: numax_guess} index shared by the light curves of a batch, set once per worker process
+_batch_guesses = None
+
+
+def _init_batch_worker(guesses):
+    global _batch_guesses
+    _batch_guesses = guesses
+
+
+def _process_batch_item(lc_path, digest, store, mc_iter, mc_tol, band_limited):
+    result = process_lc_file(lc_path, guess_table=_batch_guesses, store=store, mc_iter=mc_iter,
+                             mc_tol=mc_tol, band_limited=band_limited, verbose=False)
+    result['hash'] = digest
+    return result
+
+
+def process_lc_files(lc_files, output, guess_table=None, store=None, n_workers=None, resume=True,
+                     retry_errors=False, mc_iter=200, mc_tol=None, band_limited=False, verbose=True):
+    """Runs process_lc_file on many light curves in a process pool, checkpointing each result to a
+    CSV table as soon as it is available. Light curves already in the table (same content hash) are
+    skipped, so that an interrupted run can be resumed.
+
+    Args:
+        lc_files (str or list): Directory laid out as lc_dir/star/*.fits, or list of FITS files, or
+            keys of light curves in store (all the corrected light curves of store if None).
+        output (str): Path of the CSV checkpoint table.
+        guess_table (pd.DataFrame or dict, optional): numax guesses, see process_lc_file. Defaults to None.
+        store (str, optional): Path of the light curve store lc_files refer to. Defaults to None.
+        n_workers (int, optional): Number of processes. Defaults to None (number of CPUs). Use 1 to
+            process the light curves serially.
+        resume (bool, optional): Whether to skip the light curves already in output. Defaults to True.
+        retry_errors (bool, optional): Whether to process again the light curves that failed in a
+            previous run. Defaults to False.
+        mc_iter (int, optional): Maximum number of Monte Carlo realizations. Defaults to 200.
+        mc_tol (float, optional): Tolerance of the adaptive Monte Carlo, see nuSYD. Defaults to None.
+        band_limited (bool, optional): Whether to smooth only the band around numax, see nuSYD.
+            Defaults to False.
+        verbose (bool, optional): Whether to print verbose output. Defaults to True.
+
+    Returns:
+        pd.DataFrame: The checkpoint table, with the results of previous and current runs.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from glob import glob
+    if lc_files is None:
+        with LightCurveStore(store, mode='r') as lc_store:
+            lc_files = lc_store.keys(kind='corrected')
+    elif isinstance(lc_files, str):
+        lc_files = sorted(glob(os.path.join(lc_files, '*', '*.fits')))
+    hashes = {lc_path: content_hash(lc_path, store) for lc_path in lc_files}
+
+    done = set()
+    if resume and os.path.exists(output):
+        previous = pd.read_csv(output)
+        if retry_errors:
+            previous = previous[previous['error'].isna()]
+            previous.to_csv(output, index=False)
+        done = set(previous['hash'])
+    elif os.path.exists(output):
+        os.remove(output)
+    todo = [lc_path for lc_path in lc_files if hashes[lc_path] not in done]
+    if verbose:
+        logging.info(
+            f"[INFO] {len(todo)} light curves to process, {len(lc_files) - len(todo)} already done.")
+
+    guesses = _guess_index(guess_table)
+
+    def _checkpoint(result):
+        row = pd.DataFrame([result]).reindex(columns=BATCH_COLUMNS)
+        row.to_csv(output, mode='a', index=False, header=not os.path.exists(output))
+
+    args = (store, mc_iter, mc_tol, band_limited)
+    remaining = list(todo)
+    if n_workers != 1 and len(todo) > 1:
+        try:
+            # the guess index is sent once to each worker rather than with every light curve
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_batch_worker,
+                                     initargs=(guesses,)) as executor:
+                futures = {executor.submit(_process_batch_item, lc_path, hashes[lc_path], *args): lc_path
+                           for lc_path in todo}
+                for future in as_completed(futures):
+                    _checkpoint(future.result())
+                    remaining.remove(futures[future])
+        except Exception as e:
+            if verbose:
+                logging.warning(
+                    f"[WARN] Parallel processing failed ({e}), processing the remaining light curves serially.")
+    _init_batch_worker(guesses)
+    try:
+        for lc_path in remaining:
+            _checkpoint(_process_batch_item(lc_path, hashes[lc_path], *args))
+    finally:
+        _init_batch_worker(None)
+
+    table = pd.read_csv(output) if os.path.exists(output) else pd.DataFrame()
+    if verbose and len(todo) > 0:
+        stages = ['t_read', 't_detrend', 't_nusyd']
+        timings = table[table['hash'].isin([hashes[lc_path] for lc_path in todo])][stages]
+        n_errors = table['error'].notna().sum()
+        logging.info(f"[INFO] {len(todo)} light curves processed ({n_errors} errors in the table). "
+                     "Time per stage (total / mean, s): " +
+                     ", ".join(f"{c[2:]} {timings[c].sum():.2f} / {timings[c].mean():.3f}" for c in stages))
+    return table
@@ -323,7 +323,7 @@ def plot_phase_fold(
     return fig, ax
 
 
-def plot_series_periodogram(rv_data, series, adjust_means=True, ax=None, fig=None, fap_level=1e-3, min_freq=None, max_freq=None, samples=10000, verbose=True):
+def series_periodogram(rv_data, series, adjust_means=True, fap_level=1e-3, min_freq=None, max_freq=None, samples=10000, verbose=True):
     from .tseries import gls_periodogram
     from .stats import weighted_mean
     rv_data = rv_data.copy()
@@ -340,8 +340,16 @@ def plot_series_periodogram(rv_data, series, adjust_means=True, ax=None, fig=Non
             if verbose:
                 print(
                     f'Adjusted means for ins {ins} by subtracting {mean_rv:.2f}')
-    freq, power, best_period, fap, power_threshold = gls_periodogram(
-        rv_data.rjd, rv_data[series], series_err)
+    return gls_periodogram(
+        rv_data.rjd, rv_data[series], series_err, min_freq=min_freq, max_freq=max_freq,
+        fap_level=fap_level, samples=samples)
+
+
+def plot_series_periodogram(rv_data, series, adjust_means=True, ax=None, fig=None, fap_level=1e-3, min_freq=None, max_freq=None, samples=10000, verbose=True, periodogram=None):
+    if periodogram is None:
+        periodogram = series_periodogram(rv_data, series, adjust_means=adjust_means, fap_level=fap_level,
+                                         min_freq=min_freq, max_freq=max_freq, samples=samples, verbose=verbose)
+    freq, power, best_period, fap, power_threshold = periodogram
     if ax is None:
         fig, ax = plt.subplots()
     ax.plot(1/freq, power)
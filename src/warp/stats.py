@@ -2,10 +2,23 @@ import numpy as np
 import pandas as pd
 
 
+def _segment_medians(sorted_values, starts, counts):
+    """Medians of consecutive segments of an array sorted within each segment (NaN if empty)."""
+    medians = np.full(len(counts), np.nan)
+    ok = counts > 0
+    lo = starts[ok] + (counts[ok] - 1) // 2
+    hi = starts[ok] + counts[ok] // 2
+    medians[ok] = (sorted_values[lo] + sorted_values[hi]) / 2
+    return medians
+
+
 def mad_clip_mask(values, groups=None, threshold=5, n_iter=3, verbose=False):
     """
     Return boolean mask marking which points are kept by MAD clipping.
 
+    All the groups are clipped at once: the points are sorted by group once, and the medians
+    and MADs of every group are computed with segmented operations at each iteration.
+
     Args:
         values (1D array): Quantity to clip (e.g., RV, FWHM, BIS).
         groups (1D array or None): Optional grouping (e.g., instrument names).
@@ -15,39 +28,60 @@ def mad_clip_mask(values, groups=None, threshold=5, n_iter=3, verbose=False):
     Returns:
         mask (np.array of bool): True = kept, False = clipped.
     """
-    values = np.asarray(values)
+    values = np.asarray(values, dtype=float)
     mask = np.ones(len(values), dtype=bool)
+    if len(values) == 0:
+        return mask
 
     if groups is None:
-        groups = np.array(["__all__"] * len(values))
+        group_idx = np.zeros(len(values), dtype=np.int64)
+        n_groups = 1
     else:
-        groups = np.asarray(groups)
+        _, group_idx = np.unique(np.asarray(groups), return_inverse=True)
+        group_idx = group_idx.ravel()
+        n_groups = group_idx.max() + 1
+
+    # sort once by (group, value): the kept values of a group stay sorted within its segment
+    order = np.lexsort((values, group_idx))
+    sorted_groups = group_idx[order]
+    sorted_values = values[order]
+    kept = np.ones(len(values), dtype=bool)  # in sorted order
+    active = np.ones(n_groups, dtype=bool)
 
-    for g in np.unique(groups):
-        idx = np.where(groups == g)[0]
-        submask = np.ones(len(idx), dtype=bool)
-        subvals = values[idx]
+    for it in range(n_iter):
+        counts = np.bincount(sorted_groups[kept], minlength=n_groups)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        median = _segment_medians(sorted_values[kept], starts, counts)
+        # like np.median, a NaN in a group makes its median NaN
+        has_nan = np.bincount(sorted_groups[kept], weights=np.isnan(
+            sorted_values[kept]), minlength=n_groups) > 0
+        median[has_nan] = np.nan
+
+        absdev = np.abs(sorted_values - median[sorted_groups])
+        dev_order = np.lexsort((absdev[kept], sorted_groups[kept]))
+        mad = _segment_medians(absdev[kept][dev_order], starts, counts)
+        mad[has_nan] = np.nan
+        # groups with a null MAD are left as they are
+        active &= mad != 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            modz = 0.6745 * (sorted_values - median[sorted_groups]) / \
+                mad[sorted_groups]
+        new_kept = np.abs(modz) < threshold
+        changed = np.bincount(sorted_groups, weights=new_kept != kept,
+                              minlength=n_groups) > 0
         if verbose:
-            print(f"[INFO] MAD clipping for group: {g}")
-        for _ in range(n_iter):
-            median = np.median(subvals[submask])
-            mad = np.median(np.abs(subvals[submask] - median))
-            if mad == 0:
-                break
-
-            modz = 0.6745 * (subvals - median) / mad
-            new_submask = np.abs(modz) < threshold
-            rejected = np.sum(~new_submask & submask)
-            if verbose:
-                print(f" Iter {_+1}: rejected {rejected} points.")
-            # if no change → stop
-            if np.all(new_submask == submask):
-                break
-
-            submask = new_submask
-
-        mask[idx] = submask
+            rejected = np.sum(~new_kept & kept & active[sorted_groups])
+            print(
+                f" Iter {it+1}: rejected {rejected} points in {np.sum(active)} groups.")
+        # if no change → the group is done
+        active &= changed
+        if not active.any():
+            break
+        update = active[sorted_groups]
+        kept[update] = new_kept[update]
 
+    mask[order] = kept
     return mask
 
 
@@ -66,3 +100,44 @@ def weighted_mean(values, errors):
     mean = np.sum(values * weights) / np.sum(weights)
     mean_error = np.sqrt(1 / np.sum(weights))
     return mean, mean_error
+
+
+def grouped_weighted_mean(data, columns, by, errors=None, skipna=True):
+    """
+    Compute the weighted mean of several columns within groups, in a single pass.
+
+    Args:
+        data (pd.DataFrame): Data containing the values, uncertainties and group columns.
+        columns (list): Columns to average.
+        by (list): Columns defining the groups.
+        errors (list or None): Uncertainty columns matching `columns`. Defaults to '{col}_err'.
+        skipna (bool): If True, points with a non-finite value or uncertainty are ignored.
+            Otherwise they make the mean of their group NaN, as weighted_mean does.
+
+    Returns:
+        means (pd.DataFrame): Weighted means, indexed by group, one column per value column.
+        mean_errors (pd.DataFrame): Uncertainties of the weighted means, one column per error column.
+    """
+    columns = list(columns)
+    if errors is None:
+        errors = [f"{col}_err" for col in columns]
+    y = data[columns].to_numpy(dtype=float)
+    w = 1 / data[errors].to_numpy(dtype=float) ** 2
+    if skipna:
+        valid = np.isfinite(y) & np.isfinite(w)
+        y = np.where(valid, y, 0.)
+        w = np.where(valid, w, 0.)
+    keys = [data[col] for col in by]
+    terms = np.hstack([w * y, w])
+    sums = pd.DataFrame(terms, index=data.index).groupby(keys).sum()
+    if not skipna:
+        has_nan = pd.DataFrame(np.isnan(terms), index=data.index).groupby(keys).any()
+        sums = sums.mask(has_nan)
+    n = len(columns)
+    wy_sum = sums.iloc[:, :n].to_numpy()
+    w_sum = sums.iloc[:, n:].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = wy_sum / w_sum
+        mean_errors = np.sqrt(1 / w_sum)
+    return (pd.DataFrame(means, index=sums.index, columns=columns),
+            pd.DataFrame(mean_errors, index=sums.index, columns=errors))
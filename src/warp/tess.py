@@ -7,15 +7,17 @@ import astropy.units as u
 import warnings
 from lightkurve.correctors import RegressionCorrector
 from lightkurve.correctors import DesignMatrix
-from multiprocessing import Process, Queue
+import multiprocessing
 import tempfile
+import shutil
 import os
 import logging
 warnings.filterwarnings("ignore")
 logging.basicConfig(level=logging.INFO)
 
 
-def download_and_extract_lcs(star_name, sector=None, limit=35, cutout_size=(35, 35), timeout=45, verbose=True, download='individual'):
+def download_and_extract_lcs(star_name, sector=None, limit=35, cutout_size=(35, 35), timeout=45, verbose=True, download='individual', use_cache=False, cache_dir=None,
+                            n_workers=None, return_stitched=False, low_memory=False, store=None):
     """Downloads and extracts light curves of the TESS mission from the tesscut images
 
     Args:
@@ -26,23 +28,122 @@ def download_and_extract_lcs(star_name, sector=None, limit=35, cutout_size=(35,
         timeout (int, optional): Timeout for the download. Defaults to 45.
         verbose (bool, optional): Whether to print verbose output. Defaults to True.
         download (str, optional): Type of download to perform. Defaults to 'individual'. Options are 'individual' or 'bulk'.
+        use_cache (bool, optional): Whether to use the local TESScut cache, see load_tpf_by_name. Defaults to False.
+        cache_dir (str, optional): Root of the local cache. Defaults to config.cache_dir.
+        n_workers (int, optional): Number of processes used to extract the sectors, see process_sectors.
+            Defaults to None (number of CPUs).
+        return_stitched (bool, optional): Whether to also return the stitched light curve. Defaults to False.
+        low_memory (bool, optional): Whether to process the flux cubes by chunks, see lc_from_tpf. Defaults to False.
+        store (str, optional): Path of a LightCurveStore where the corrected and uncorrected light curves
+            are also saved. Defaults to None.
 
     Returns:
-        _type_: _description_
+        list: (corrected, uncorrected) light curves of each sector, or None if no TPF was found.
+        If return_stitched, a tuple (lcs, stitched) with stitched the per-sector normalised and
+        stitched corrected light curve.
     """
     tpfs = load_tpf_by_name(star_name, sector=sector, limit=limit,
-                            cutout_size=cutout_size, timeout=timeout, verbose=verbose, download=download)
+                            cutout_size=cutout_size, timeout=timeout, verbose=verbose, download=download,
+                            use_cache=use_cache, cache_dir=cache_dir)
     if tpfs is None:
-        return None
+        return (None, None) if return_stitched else None
+    lcs = process_sectors(tpfs, n_workers=n_workers, verbose=verbose, low_memory=low_memory)
+    if store is not None:
+        from .lcstore import LightCurveStore
+        with LightCurveStore(store) as lc_store:
+            keys = lc_store.write_sectors(star_name, lcs)
+        if verbose:
+            logging.info(f"[INFO] {len(keys)} light curves saved to {store}.")
+    if return_stitched:
+        return lcs, stitch_sectors(lcs)
+    return lcs
+
+
+def _process_tpf_path(path, verbose=True, low_memory=False):
+    return lc_from_tpf(lk.read(path), verbose=verbose, low_memory=low_memory)
+
+
+def process_sectors(tpfs, n_workers=None, verbose=True, low_memory=False):
+    """Extracts the corrected and uncorrected light curves of several TPFs in a process pool.
+    The TPFs are re-read from their file in the workers; TPFs without a file on disk, and all of them
+    if the pool cannot be used, are processed serially.
+
+    Args:
+        tpfs (list): Target pixel files, one per sector.
+        n_workers (int, optional): Number of processes. Defaults to None (number of CPUs). Use 1 to
+            process the sectors serially.
+        verbose (bool, optional): Whether to print verbose output. Defaults to True.
+        low_memory (bool, optional): Whether to process the flux cubes by chunks, see lc_from_tpf.
+            Defaults to False.
+
+    Returns:
+        list: (corrected, uncorrected) light curves of the sectors that could be processed, in the
+        order of tpfs.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    tpfs = list(tpfs)
+    results = [None] * len(tpfs)
+    on_disk = [i for i, tpf in enumerate(tpfs)
+               if isinstance(getattr(tpf, 'path', None), str) and os.path.exists(tpf.path)]
+    if n_workers != 1 and len(on_disk) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                outcomes = executor.map(_process_tpf_path, [tpfs[i].path for i in on_disk],
+                                        [verbose] * len(on_disk), [low_memory] * len(on_disk))
+                for i, outcome in zip(on_disk, outcomes):
+                    results[i] = outcome
+        except Exception as e:
+            if verbose:
+                logging.warning(
+                    f"[WARN] Parallel sector processing failed ({e}), processing serially.")
     lcs = []
-    for tpf in tpfs:
-        corrected, uncorrected = lc_from_tpf(tpf, verbose=verbose)
+    for tpf, result in zip(tpfs, results):
+        if result is None:
+            result = lc_from_tpf(tpf, verbose=verbose, low_memory=low_memory)
+        corrected, uncorrected = result
         if corrected is not None and uncorrected is not None:
             lcs.append((corrected, uncorrected))
     return lcs
 
 
-def lc_from_tpf(tpf, verbose=True):
+def stitch_sectors(lcs, which='corrected'):
+    """Stitches the light curves of several sectors, each being normalised by its median.
+
+    Args:
+        lcs (list): (corrected, uncorrected) light curves, as returned by process_sectors.
+        which (str, optional): 'corrected' or 'uncorrected'. Defaults to 'corrected'.
+
+    Returns:
+        lk.LightCurve: The stitched light curve, or None if lcs is empty.
+    """
+    if lcs is None or len(lcs) == 0:
+        return None
+    index = 0 if which == 'corrected' else 1
+    return lk.LightCurveCollection([lc[index] for lc in lcs]).stitch(lambda lc: lc.normalize())
+
+
+def lc_from_tpf(tpf, verbose=True, low_memory=False, chunk_size=1000):
+    """Extracts the uncorrected aperture light curve of a TPF and corrects it from the scattered light
+    with a regression on the first principal components of the background pixels.
+
+    Args:
+        tpf (lk.TargetPixelFile): The target pixel file.
+        verbose (bool, optional): Whether to print verbose output. Defaults to True.
+        low_memory (bool, optional): Whether to read the flux cube from the TPF file with memory mapping
+            and process it by chunks of cadences, instead of loading it in memory. Only used if the
+            TPF has a file on disk. Defaults to False.
+        chunk_size (int, optional): Number of cadences per chunk in low_memory mode. Defaults to 1000.
+
+    Returns:
+        tuple: The corrected and uncorrected light curves, or (None, None) if the extraction failed.
+    """
+    if low_memory and isinstance(getattr(tpf, 'path', None), str) and os.path.exists(tpf.path):
+        try:
+            return _lc_from_tpf_memmap(tpf, chunk_size=chunk_size)
+        except Exception as e:
+            if verbose:
+                logging.warning(f"[WARN] Failed to process TPF: {e}")
+            return None, None
     try:
         # tpf = tpf.remove_nans()
         finite_mask = np.isfinite(tpf.flux).all(axis=(1, 2))
@@ -67,40 +168,332 @@ def lc_from_tpf(tpf, verbose=True):
     return corrected_ffi_lc, uncorrected_lc
 
 
-def _download_to_fits(row, cutout_size, filename, queue):
+def _threshold_mask(median_image, threshold=3):
+    # Same as TargetPixelFile.create_threshold_mask, from a precomputed median image
+    from astropy.stats import median_absolute_deviation
+    from scipy.ndimage import label
+    reference_pixel = (median_image.shape[1] / 2, median_image.shape[0] / 2)
+    vals = median_image[np.isfinite(median_image)].flatten()
+    mad_cut = (1.4826 * median_absolute_deviation(vals) * threshold) + \
+        np.nanmedian(median_image)
+    threshold_mask = np.nan_to_num(median_image) >= mad_cut
+    if not threshold_mask.any():
+        return threshold_mask
+    labels = label(threshold_mask)[0]
+    label_args = np.argwhere(labels > 0)
+    distances = np.hypot(*(label_args - np.array(
+        [reference_pixel[1], reference_pixel[0]])).T)
+    closest_arg = label_args[np.argmin(distances)]
+    return labels == labels[closest_arg[0], closest_arg[1]]
+
+
+def _lc_from_tpf_memmap(tpf, chunk_size=1000, n_pca=5):
+    """lc_from_tpf working on the memory mapped flux cube of the TPF file, by chunks of cadences.
+    The background principal components are obtained from the eigen decomposition of the
+    covariance matrix of the background pixels, accumulated over the chunks."""
+    from astropy.io import fits
+    from astropy.units import Quantity
+    with fits.open(tpf.path, memmap=True) as hdul:
+        data = hdul[1].data
+        flux_cube, err_cube = data['FLUX'], data['FLUX_ERR']
+        n_raw = flux_cube.shape[0]
+        chunks = [slice(a, min(a + chunk_size, n_raw))
+                  for a in range(0, n_raw, chunk_size)]
+
+        # Good cadences: quality mask of the TPF and finite flux in all the pixels
+        good = np.asarray(tpf.quality_mask, dtype=bool).copy()
+        for c in chunks:
+            block = flux_cube[c][good[c]]
+            good[c][good[c]] = np.isfinite(block).all(axis=(1, 2))
+        n_good = int(good.sum())
+
+        # Median image over the good cadences, by blocks of pixel rows
+        n_rows, n_cols = flux_cube.shape[1:]
+        rows_per_block = max(1, (chunk_size * n_rows) // max(n_good, 1))
+        median_image = np.empty((n_rows, n_cols))
+        for r in range(0, n_rows, rows_per_block):
+            block = flux_cube[:, r:r + rows_per_block, :][good]
+            median_image[r:r + rows_per_block] = np.nanmedian(block, axis=0)
+        aper = _threshold_mask(median_image)
+        bkg = ~aper
+
+        # Aperture photometry, centroids and background covariance
+        yy, xx = np.indices((n_rows, n_cols))
+        yy, xx = (tpf.row + yy)[aper], (tpf.column + xx)[aper]
+        flux = np.empty(n_good)
+        flux_err = np.empty(n_good)
+        col_centr = np.empty(n_good)
+        row_centr = np.empty(n_good)
+        n_bkg = int(bkg.sum())
+        xtx = np.zeros((n_bkg, n_bkg))
+        xsum = np.zeros(n_bkg)
+        i = 0
+        for c in chunks:
+            block = np.asarray(flux_cube[c][good[c]], dtype=float)
+            j = i + len(block)
+            in_aper = block[:, aper]
+            flux[i:j] = in_aper.sum(axis=1)
+            flux[i:j][(block == 0).all(axis=(1, 2))] = np.nan
+            flux_err[i:j] = np.nansum(
+                np.asarray(err_cube[c][good[c]], dtype=float)[:, aper] ** 2, axis=1) ** 0.5
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                col_centr[i:j] = (in_aper * xx).sum(axis=1) / flux[i:j]
+                row_centr[i:j] = (in_aper * yy).sum(axis=1) / flux[i:j]
+            x = block[:, bkg]
+            xtx += x.T @ x
+            xsum += x.sum(axis=0)
+            i = j
+
+        # Principal components of the centered background pixels (left singular vectors)
+        mean = xsum / n_good
+        cov = xtx - n_good * np.outer(mean, mean)
+        n_pca = min(n_pca, n_bkg)
+        eigval, eigvec = np.linalg.eigh(cov)
+        eigval, eigvec = eigval[::-1][:n_pca], eigvec[:, ::-1][:, :n_pca]
+        components = np.empty((n_good, n_pca))
+        i = 0
+        for c in chunks:
+            x = np.asarray(flux_cube[c][good[c]], dtype=float)[:, bkg]
+            components[i:i + len(x)] = (x - mean) @ eigvec
+            i += len(x)
+        components /= np.sqrt(np.clip(eigval, np.finfo(float).tiny, None))
+        flux_unit = 'electron/s' if hdul[1].header.get('TUNIT5') == 'e-/s' else None
+
+    tpf_good = good[np.asarray(tpf.quality_mask, dtype=bool)]
+    uncorrected_lc = lk.TessLightCurve(
+        time=tpf.time[tpf_good],
+        flux=Quantity(flux, unit=flux_unit),
+        flux_err=Quantity(flux_err, unit=flux_unit),
+        centroid_col=col_centr * u.pixel,
+        centroid_row=row_centr * u.pixel,
+        quality=tpf.quality[tpf_good],
+        cadenceno=tpf.cadenceno[tpf_good],
+        sector=tpf.sector, camera=tpf.camera, ccd=tpf.ccd, mission=tpf.mission,
+        ra=tpf.ra, dec=tpf.dec, targetid=tpf.targetid,
+        label=tpf.get_keyword("OBJECT", default=tpf.targetid),
+        meta={"APERTURE_MASK": aper})
+    uncorrected_lc = uncorrected_lc.remove_nans()
+    dm = DesignMatrix(components[np.isfinite(flux)], name='regressors').append_constant()
+    rc = RegressionCorrector(uncorrected_lc)
+    rc.correct(dm)
+    corrected_ffi_lc = uncorrected_lc - rc.model_lc + \
+        np.percentile(rc.model_lc.flux, 5)
+    corrected_ffi_lc = corrected_ffi_lc.remove_nans()
+    return corrected_ffi_lc, uncorrected_lc
+
+
+def _download_row_to_fits(row, cutout_size, filename):
+    # lightkurve writes the cutout in download_dir: download it next to filename and move it there,
+    # instead of writing a second copy from the lightkurve cache
+    download_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(filename)))
     try:
-        tpf = row.download(cutout_size=cutout_size)
-        tpf.to_fits(filename, overwrite=True)
-        queue.put(filename)
+        tpf = row.download(cutout_size=cutout_size, download_dir=download_dir)
+        tpf.hdu.close()
+        shutil.move(tpf.path, filename)
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+
+def _read_tpf_in_memory(filename):
+    """Reads a TPF entirely into memory, so that its file can be removed."""
+    from astropy.io import fits
+    with open(filename, 'rb') as f:
+        return lk.read(fits.HDUList.fromstring(f.read()))
+
+
+def _download_to_fits(row, cutout_size, filename, queue, download_fn=_download_row_to_fits):
+    try:
+        download_fn(row, cutout_size, filename)
+        queue.put((True, filename))
+    except Exception as e:
+        queue.put((False, repr(e)))
+
+
+def _sector_label(row):
+    try:
+        return str(row.mission[0])
     except Exception:
-        queue.put(None)
+        return str(row)
 
 
-def download_with_timeout(row, cutout_size=(25, 25), timeout=60):
-    q = Queue()
+def _download_context():
+    # download_tpfs calls download_with_timeout from worker threads, where forking is unsafe: the
+    # download processes are forked from a single-threaded server which has already imported this
+    # module, or spawned where there is no fork server
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    ctx = multiprocessing.get_context('forkserver')
+    ctx.set_forkserver_preload([__name__])
+    return ctx
 
-    with tempfile.NamedTemporaryFile(suffix=".fits", delete=False) as tmp:
-        fname = tmp.name
 
-    p = Process(target=_download_to_fits, args=(row, cutout_size, fname, q))
-    p.start()
-    p.join(timeout)
+def download_with_timeout(row, cutout_size=(25, 25), timeout=60, download_fn=None, download_dir=None, filename=None):
+    """Downloads one TESScut row to a FITS file in a separate process, killed after timeout seconds.
 
-    if p.is_alive():
-        p.terminate()
-        p.join()
-        return None
+    Args:
+        row (lk.SearchResult): Single row of a TESScut search result.
+        cutout_size (tuple, optional): Size of the cutout image. Defaults to (25, 25).
+        timeout (float, optional): Maximum duration of the download in seconds. Defaults to 60.
+        download_fn (callable, optional): Function (row, cutout_size, filename) writing the cutout to
+            filename, run in a fork server or spawned process so it must be importable (defined at
+            module level).
+            Defaults to downloading with lightkurve.
+        download_dir (str, optional): Directory of the FITS file, created if missing. Defaults to the
+            temporary directory.
+        filename (str, optional): Path of the FITS file, overrides download_dir. Defaults to None.
 
-    result = q.get() if not q.empty() else None
+    Returns:
+        str: Path to the downloaded FITS file. On failure, the file (and download_dir if it was
+        created and is empty) is removed.
 
-    if result is None:
-        if os.path.exists(fname):
-            os.remove(fname)
-        return None
+    Raises:
+        TimeoutError: If the download did not finish within timeout seconds.
+        RuntimeError: If the download failed.
+    """
+    if download_fn is None:
+        download_fn = _download_row_to_fits
+    ctx = _download_context()
+    q = ctx.Queue()
+
+    created_dir = None
+    if filename is not None:
+        fname = filename
+    else:
+        if download_dir is not None and not os.path.isdir(download_dir):
+            os.makedirs(download_dir, exist_ok=True)
+            created_dir = download_dir
+        with tempfile.NamedTemporaryFile(suffix=".fits", delete=False, dir=download_dir) as tmp:
+            fname = tmp.name
+
+    p = None
+    success = False
+    try:
+        p = ctx.Process(target=_download_to_fits, args=(
+            row, cutout_size, fname, q, download_fn))
+        p.start()
+        p.join(timeout)
+
+        if p.is_alive():
+            raise TimeoutError(f'Download timed out after {timeout} s')
+
+        success, result = q.get() if not q.empty() else (
+            False, f'Download process exited with code {p.exitcode}')
+        if not success:
+            raise RuntimeError(result)
+    finally:
+        if not success:
+            # timed out, failed or interrupted: kill the worker and leave nothing behind
+            if p is not None and p.is_alive():
+                p.terminate()
+                p.join()
+            if os.path.exists(fname):
+                os.remove(fname)
+            if created_dir is not None:
+                try:
+                    os.rmdir(created_dir)
+                except OSError:
+                    pass  # not empty, e.g. other sectors downloaded there
 
     return fname
 
 
+def download_tpfs(rows, cutout_size=(25, 25), timeout=60, max_workers=4, retries=2, backoff=2.0,
+                  download_fn=None, download_dir=None, verbose=True, cache=None, keys=None):
+    """Downloads several TESScut rows concurrently, each attempt being limited to timeout seconds.
+    Failed or timed out downloads are retried with an exponential backoff.
+
+    Args:
+        rows (iterable): Rows of a TESScut search result.
+        cutout_size (tuple, optional): Size of the cutout image. Defaults to (25, 25).
+        timeout (float, optional): Maximum duration of one download attempt in seconds. Defaults to 60.
+        max_workers (int, optional): Maximum number of simultaneous downloads. Defaults to 4.
+        retries (int, optional): Number of retries after a failed attempt. Defaults to 2.
+        backoff (float, optional): Delay before the first retry in seconds, doubled at each retry.
+            Defaults to 2.0.
+        download_fn (callable, optional): Function (row, cutout_size, filename) writing the cutout to
+            filename, e.g. a stand-in for the TESScut service, defined at module level. Defaults to
+            downloading with lightkurve.
+        download_dir (str, optional): Directory where the FITS files are kept. Defaults to None: without
+            cache, the files are written to the temporary directory and removed once read into memory.
+        verbose (bool, optional): Whether to log the progress. Defaults to True.
+        cache (FileCache, optional): Cache where the downloaded files are stored. Defaults to None.
+        keys (list, optional): Cache keys of the rows, required with cache. Defaults to None.
+
+    Returns:
+        tuple: The list of downloaded TPFs, in the order of rows, and a list of failures as dicts
+        with keys sector, attempts and error.
+    """
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    def _fetch(row, key):
+        label = _sector_label(row)
+        error = None
+        for attempt in range(retries + 1):
+            if attempt > 0:
+                time.sleep(backoff * 2 ** (attempt - 1))
+            try:
+                fname = download_with_timeout(
+                    row, cutout_size=cutout_size, timeout=timeout, download_fn=download_fn,
+                    download_dir=download_dir,
+                    filename=cache.temp_path(key, '.fits') if cache is not None else None)
+                if cache is not None:
+                    tpf = lk.read(cache.put(key, fname, '.fits'))
+                elif download_dir is None:
+                    try:
+                        tpf = _read_tpf_in_memory(fname)
+                    finally:
+                        os.remove(fname)
+                else:
+                    tpf = lk.read(fname)
+                if verbose:
+                    logging.info(f"[INFO] Downloaded {label}")
+                return tpf, None
+            except Exception as e:
+                error = e
+                if verbose:
+                    logging.warning(
+                        f"[WARN] Attempt {attempt + 1}/{retries + 1} failed for {label}: {e}")
+        return None, {'sector': label, 'attempts': retries + 1, 'error': repr(error)}
+
+    rows = list(rows)
+    if len(rows) == 0:
+        return [], []
+    if keys is None:
+        keys = [None] * len(rows)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outcomes = list(executor.map(_fetch, rows, keys))
+    tpfs = [tpf for tpf, _ in outcomes if tpf is not None]
+    failures = [failure for _, failure in outcomes if failure is not None]
+    return tpfs, failures
+
+
+def _row_sector(row):
+    try:
+        return int(row.table['sequence_number'][0])
+    except Exception:
+        return int(''.join(c for c in _sector_label(row) if c.isdigit()))
+
+
+def _normalize_target(target):
+    return ' '.join(str(target).split()).upper()
+
+
+def _tesscut_key(target, sector, cutout_size):
+    from .cache import cache_key
+    return cache_key('tesscut', _normalize_target(target), int(sector),
+                     list(cutout_size) if cutout_size is not None else None)
+
+
+def _tess_caches(cache_dir=None):
+    from .cache import FileCache
+    from .config import tess_cache_max_bytes, tess_listing_cache_ttl
+    tpf_cache = FileCache('tesscut', max_bytes=tess_cache_max_bytes, cache_dir=cache_dir)
+    listing_cache = FileCache('tess_listings', max_age=tess_listing_cache_ttl, cache_dir=cache_dir)
+    return tpf_cache, listing_cache
+
+
 def load_tpf_by_name(
     star_name,
     sector=None,
@@ -108,52 +501,129 @@ def load_tpf_by_name(
     cutout_size=(25, 25),
     timeout=60,
     verbose=True,
-    download='bulk'
+    download='bulk',
+    max_workers=4,
+    retries=2,
+    return_failures=False,
+    download_fn=None,
+    use_cache=False,
+    cache_dir=None
 
 ):
+    """Downloads the TESScut target pixel files of a star.
+
+    Args:
+        star_name (str): Name of the star.
+        sector (list, optional): List of sectors to download. Defaults to None.
+        limit (int, optional): Maximum number of TPFs to download. Defaults to 35.
+        cutout_size (tuple, optional): Size of the cutout image. Defaults to (25, 25).
+        timeout (int, optional): Timeout of each sector download in seconds, in individual mode.
+            Defaults to 60.
+        verbose (bool, optional): Whether to print verbose output. Defaults to True.
+        download (str, optional): 'bulk' or 'individual'. Defaults to 'bulk'.
+        max_workers (int, optional): Maximum number of simultaneous downloads in individual mode.
+            Defaults to 4.
+        retries (int, optional): Number of retries of a failed sector in individual mode. Defaults to 2.
+        return_failures (bool, optional): Whether to also return the list of failed sectors.
+            Defaults to False.
+        download_fn (callable, optional): Replacement for the TESScut download, see download_tpfs.
+        use_cache (bool, optional): Whether to read the TPFs from the local cache, keyed by
+            (target, sector, cutout_size), and store the downloaded ones in it. The list of available
+            sectors is cached for config.tess_listing_cache_ttl seconds, so a fully cached star needs
+            no remote query. Defaults to False.
+        cache_dir (str, optional): Root of the local cache. Defaults to config.cache_dir.
+
+    Returns:
+        list: The TPFs, or None if none could be downloaded. If return_failures, a tuple
+        (tpfs, failures).
+    """
+
+    def _result(tpfs, failures):
+        if use_cache and verbose:
+            logging.info(f"[INFO] TESScut cache: {tpf_cache.report()}")
+        tpfs = tpfs if len(tpfs) > 0 else None
+        return (tpfs, failures) if return_failures else tpfs
+
+    if use_cache:
+        import json
+        from .cache import cache_key
+        tpf_cache, listing_cache = _tess_caches(cache_dir)
+        listing_key = cache_key('tesscut_search', _normalize_target(star_name),
+                                None if sector is None else np.atleast_1d(sector).tolist())
+        listing = listing_cache.get(listing_key, '.json')
+        if listing is not None:
+            with open(listing) as f:
+                sectors = json.load(f)
+            if limit is not None:
+                sectors = sectors[:limit]
+            keys = [_tesscut_key(star_name, sec, cutout_size) for sec in sectors]
+            if all(os.path.exists(tpf_cache.path(key, '.fits')) for key in keys):
+                paths = [tpf_cache.get(key, '.fits') for key in keys]
+                if all(path is not None for path in paths):
+                    return _result([lk.read(path) for path in paths], [])
 
     if verbose:
         logging.info(f"[INFO] Querying TESS for {star_name}...")
 
     search_result = lk.search_tesscut(star_name, sector=sector)
 
+    if use_cache:
+        tmp = listing_cache.temp_path(listing_key, '.json')
+        with open(tmp, 'w') as f:
+            json.dump([_row_sector(row) for row in search_result], f)
+        listing_cache.put(listing_key, tmp, '.json')
+
     if len(search_result) == 0:
-        return None
+        return _result([], [])
 
     if limit is not None:
         search_result = search_result[:limit]
 
-    results = []
+    tpfs = {}
+    keys = None
+    if use_cache:
+        keys = [_tesscut_key(star_name, _row_sector(row), cutout_size)
+                for row in search_result]
+        for i, key in enumerate(keys):
+            path = tpf_cache.get(key, '.fits')
+            if path is not None:
+                tpfs[i] = lk.read(path)
+    missing = [i for i in range(len(search_result)) if i not in tpfs]
+
+    def _ordered(new_tpfs):
+        # Cached and downloaded TPFs together, by sector
+        if len(tpfs) == 0:
+            return list(new_tpfs)
+        return sorted(list(tpfs.values()) + list(new_tpfs), key=lambda tpf: tpf.sector)
+
+    if len(missing) == 0:
+        return _result(_ordered([]), [])
+
     if download == 'bulk':
         try:
-            results = search_result.download_all()
-            return results if len(results) > 0 else None
+            to_download = search_result[missing] if use_cache else search_result
+            results = to_download.download_all(cutout_size=cutout_size)
+            results = results if results is not None else []
+            if use_cache:
+                for tpf in results:
+                    key = _tesscut_key(star_name, tpf.sector, cutout_size)
+                    tmp = tpf_cache.temp_path(key, '.fits')
+                    tpf.to_fits(tmp, overwrite=True)
+                    tpf_cache.put(key, tmp, '.fits')
+                return _result(_ordered(results), [])
+            return _result(results, [])
         except Exception as e:
             logging.error(f'Error occurred while downloading all TPFs: {e}')
-            return None
-    for row in search_result:
-        if verbose:
-            logging.info(f"Downloading {row.mission}")
-            # print(f"Downloading {row.mission}")
+            return _result(_ordered([]), [{'sector': 'all', 'attempts': 1, 'error': repr(e)}])
 
-        # fname = download_with_timeout(
-        #     row, cutout_size=cutout_size, timeout=timeout)
-
-        # if fname is None:
-        #     if verbose:
-        #         print(f"  [WARN] Timeout for {row.mission}")
-        #     continue
-
-        try:
-            # tpf = lk.read(fname)
-            tpf = row.download(cutout_size=cutout_size)
-            results.append(tpf)
-            # corrected, uncorrected = lc_from_tpf(tpf)
-            # results.append((corrected, uncorrected))
-        except Exception as e:
-            logging.error(f'Error with {row}')
-
-    return results if len(results) > 0 else None
+    new_tpfs, failures = download_tpfs(search_result[missing], cutout_size=cutout_size, timeout=timeout,
+                                       max_workers=max_workers, retries=retries, download_fn=download_fn,
+                                       verbose=verbose, cache=tpf_cache if use_cache else None,
+                                       keys=[keys[i] for i in missing] if use_cache else None)
+    for failure in failures:
+        logging.error(
+            f"Error with {failure['sector']} after {failure['attempts']} attempts: {failure['error']}")
+    return _result(_ordered(new_tpfs), failures)
 
 
 def to_fits_light(lc, filename, verbose=True):
@@ -174,12 +644,38 @@ def to_fits_light(lc, filename, verbose=True):
     return
 
 
+def to_store_light(lc, store, star, sector=None, kind='corrected', provenance=None, verbose=True):
+    """Saves a light curve in a LightCurveStore, the compact alternative to to_fits_light.
+
+    Args:
+        lc (lk.LightCurve): The light curve.
+        store (str): Path of the store (HDF5 file, created if missing).
+        star (str): Name of the star.
+        sector (int, optional): TESS sector. Defaults to the sector of the light curve.
+        kind (str, optional): 'corrected' or 'uncorrected'. Defaults to 'corrected'.
+        provenance (str, optional): Pipeline or author of the light curve. Defaults to the AUTHOR of
+            the light curve, or 'unknown'.
+        verbose (bool, optional): Whether to print verbose output. Defaults to True.
+
+    Returns:
+        str: Key of the light curve in the store.
+    """
+    from .lcstore import LightCurveStore
+    with LightCurveStore(store) as lc_store:
+        key = lc_store.write_lightcurve(star, lc, sector=sector, kind=kind, provenance=provenance)
+    if verbose:
+        logging.info(f"[INFO] Light curve saved to {store} ({key}).")
+    return key
+
+
 def detrend(time, flux, flux_err=None,
             smooth_days=3.0,
             sigma_clip=5.0,
             return_trend=False,
             verbose=True,
-            goal='astero'):
+            goal='astero',
+            method='savgol',
+            gap_threshold=0.5):
     """
     Mild detrending for TESS red-giant light curves.
 
@@ -199,6 +695,12 @@ def detrend(time, flux, flux_err=None,
         If True, also return fitted trend.
     goal : str
         The goal of the detrending. Options are 'astero' or 'transit'.
+    method : str
+        'savgol' (linear Savitzky-Golay filter over the whole series), or
+        'median' / 'biweight' (running robust filter applied separately to
+        each segment between gaps, see robust_trend).
+    gap_threshold : float
+        Minimum gap in days between two segments, for the robust methods.
 
     Returns
     -------
@@ -210,6 +712,9 @@ def detrend(time, flux, flux_err=None,
     flux = np.asarray(flux)
     if goal not in ['astero', 'transit']:
         raise ValueError("Invalid goal. Must be 'astero' or 'transit'.")
+    if method not in ['savgol', 'median', 'biweight']:
+        raise ValueError(
+            "Invalid method. Must be 'savgol', 'median' or 'biweight'.")
     mask = np.isfinite(time) & np.isfinite(flux) & (flux > 0)
 
     if flux_err is not None:
@@ -237,18 +742,22 @@ def detrend(time, flux, flux_err=None,
         f = f[good]
         ferr = ferr[good]
 
-        # cadence
-        dt = np.nanmedian(np.diff(t))
+        if method == 'savgol':
+            # cadence
+            dt = np.nanmedian(np.diff(t))
 
-        # smoothing window in cadences
-        win = int(np.round(smooth_days / dt))
+            # smoothing window in cadences
+            win = int(np.round(smooth_days / dt))
 
-        if win % 2 == 0:
-            win += 1
+            if win % 2 == 0:
+                win += 1
 
-        win = max(win, 11)
+            win = max(win, 11)
 
-        trend = savgol_filter(f, window_length=win, polyorder=1)
+            trend = savgol_filter(f, window_length=win, polyorder=1)
+        else:
+            trend = robust_trend(t, f, smooth_days, method=method,
+                                 gap_threshold=gap_threshold)
 
         flux_flat = f / trend
 
@@ -267,23 +776,27 @@ def detrend(time, flux, flux_err=None,
         t_trend = t[trend_good]
         f_trend = f[trend_good]
 
-        # cadence
-        dt = np.nanmedian(np.diff(t_trend))
+        if method == 'savgol':
+            # cadence
+            dt = np.nanmedian(np.diff(t_trend))
 
-        # smoothing window in cadences
-        win = int(np.round(smooth_days / dt))
+            # smoothing window in cadences
+            win = int(np.round(smooth_days / dt))
 
-        if win % 2 == 0:
-            win += 1
+            if win % 2 == 0:
+                win += 1
 
-        win = max(win, 11)
+            win = max(win, 11)
 
-        trend = savgol_filter(f_trend, window_length=win, polyorder=1)
-        interp = interp1d(t_trend, trend,
-                          bounds_error=False,
-                          fill_value='extrapolate')
+            trend = savgol_filter(f_trend, window_length=win, polyorder=1)
+            interp = interp1d(t_trend, trend,
+                              bounds_error=False,
+                              fill_value='extrapolate')
 
-        trend_full = interp(t_lc)
+            trend_full = interp(t_lc)
+        else:
+            trend_full = robust_trend(t_trend, f_trend, smooth_days, t_eval=t_lc,
+                                      method=method, gap_threshold=gap_threshold)
         flux_flat = f_lc / trend_full
 
         if return_trend:
@@ -292,24 +805,122 @@ def detrend(time, flux, flux_err=None,
         return t, flux_flat
 
 
+def _sort_within_bins(values, bin_id):
+    # Single float sort on bin_id + scaled value, ~10x faster than np.lexsort. Values closer than
+    # ~1e-12 of their range may be swapped, which has no effect on the medians at that precision.
+    lo, hi = values.min(), values.max()
+    key = bin_id + 0.5 * (values - lo) / (hi - lo if hi > lo else 1.)
+    return values[np.argsort(key)]
+
+
+def robust_trend(time, flux, window, t_eval=None, method='median', gap_threshold=0.5,
+                 bins_per_window=10, n_iter=3, biweight_c=6.0):
+    """Running robust location of a light curve, computed separately on each segment between gaps.
+
+    The points of each segment are grouped in bins of window / bins_per_window days, whose robust
+    location (median or Tukey biweight) is computed for all the bins at once. The trend is the
+    running median of the bin locations over window days within each segment, interpolated
+    linearly at t_eval and held constant up to the segment edges, so that it is never
+    interpolated across a gap.
+
+    Args:
+        time (1D array): Times in days.
+        flux (1D array): Flux values, all finite.
+        window (float): Width of the running window in days.
+        t_eval (1D array, optional): Times where the trend is evaluated. Defaults to time.
+        method (str, optional): 'median' or 'biweight'. Defaults to 'median'.
+        gap_threshold (float, optional): Minimum gap in days between two segments. Defaults to 0.5.
+        bins_per_window (int, optional): Number of bins per window. Defaults to 10.
+        n_iter (int, optional): Number of iterations of the biweight location. Defaults to 3.
+        biweight_c (float, optional): Tuning constant of the biweight, in units of the MAD.
+            Defaults to 6.0.
+
+    Returns:
+        1D array: The trend at t_eval.
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+    from .stats import _segment_medians
+    if method not in ['median', 'biweight']:
+        raise ValueError("Invalid method. Must be 'median' or 'biweight'.")
+    time = np.asarray(time, dtype=float)
+    flux = np.asarray(flux, dtype=float)
+    t_eval = time if t_eval is None else np.asarray(t_eval, dtype=float)
+    if np.any(np.diff(time) < 0):
+        order = np.argsort(time, kind='stable')
+        time, flux = time[order], flux[order]
+
+    # Segments between gaps, and bins within each segment
+    new_seg = np.r_[True, np.diff(time) > gap_threshold]
+    seg = np.cumsum(new_seg) - 1
+    seg_first = np.flatnonzero(new_seg)
+    seg_last = np.r_[seg_first[1:], len(time)] - 1
+    width = window / bins_per_window
+    local_bin = ((time - time[seg_first][seg]) // width).astype(np.int64)
+    bins_per_seg = local_bin[seg_last] + 1
+    bin_seg = np.repeat(np.arange(len(seg_first)), bins_per_seg)
+    bin_id = np.r_[0, np.cumsum(bins_per_seg)[:-1]][seg] + local_bin
+    n_bins = int(bins_per_seg.sum())
+    counts = np.bincount(bin_id, minlength=n_bins)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    bin_time = np.bincount(bin_id, weights=time, minlength=n_bins) / \
+        np.maximum(counts, 1)
+
+    # Robust location of every bin
+    location = _segment_medians(
+        _sort_within_bins(flux, bin_id), starts, counts)
+    if method == 'biweight':
+        abs_dev = np.abs(flux - location[bin_id])
+        mad = _segment_medians(
+            _sort_within_bins(abs_dev, bin_id), starts, counts)
+        scale = biweight_c * np.where(mad > 0, mad, np.inf)
+        for _ in range(n_iter):
+            dev = flux - location[bin_id]
+            u2 = (dev / scale[bin_id]) ** 2
+            w = np.where(u2 < 1, (1 - u2) ** 2, 0.)
+            sum_w = np.bincount(bin_id, weights=w, minlength=n_bins)
+            shift = np.bincount(bin_id, weights=w * dev, minlength=n_bins)
+            location += np.where(sum_w > 0, shift / np.where(sum_w > 0, sum_w, 1), 0.)
+
+    # Running median of the bin locations, segments being separated by NaN padding
+    half = bins_per_window // 2
+    pad_before = half + np.arange(len(seg_first)) * half
+    padded = np.full(n_bins + (len(seg_first) + 1) * half, np.nan)
+    positions = np.arange(n_bins) + pad_before[bin_seg]
+    padded[positions] = location
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        trend_bins = np.nanmedian(
+            sliding_window_view(padded, 2 * half + 1)[positions - half], axis=1)
+
+    # Interpolation, anchored at the edges of every segment
+    ok = np.isfinite(trend_bins)
+    node_t, node_f, node_seg = bin_time[ok], trend_bins[ok], bin_seg[ok]
+    segs, first = np.unique(node_seg, return_index=True)
+    last = np.r_[first[1:], len(node_seg)] - 1
+    x = np.concatenate([time[seg_first[segs]], node_t, time[seg_last[segs]]])
+    y = np.concatenate([node_f[first], node_f, node_f[last]])
+    order = np.argsort(x, kind='stable')
+    return np.interp(t_eval, x[order], y[order])
+
+
 def ls_periodogram(time, flux_flat,
                    fmin=5.0,
                    fmax=150.0,
-                   oversample=5):
+                   oversample=5,
+                   use_float32=False):
     """
-    Compute Lomb-Scargle periodogram.
+    Compute Lomb-Scargle periodogram, on the same frequency grid as
+    LombScargle.autopower, with the fast backend tseries.fast_lomb_scargle.
     """
-    from astropy.timeseries import LombScargle
+    from .tseries import fast_lomb_scargle
     fmin_hz = fmin * 1e-6 * 86400.0
     fmax_hz = fmax * 1e-6 * 86400.0
 
-    ls = LombScargle(time, flux_flat)
-
-    freq, power = ls.autopower(
-        minimum_frequency=fmin_hz,
-        maximum_frequency=fmax_hz,
-        samples_per_peak=oversample
-    )
+    time = np.asarray(time, dtype=float)
+    df = 1 / (oversample * (np.max(time) - np.min(time)))
+    n_freq = 1 + int(np.round((fmax_hz - fmin_hz) / df))
+    freq = fmin_hz + df * np.arange(n_freq)
+    power = fast_lomb_scargle(time, flux_flat, freq, use_float32=use_float32)
 
     freq_uHz = freq / 86400.0 * 1e6
 
@@ -378,6 +989,120 @@ def save_for_pysyd(filename, time, flux):
     )
 
 
+def transit_ephemerides(rvmod):
+    """Transit ephemerides of the planets of an RV model, in BJD.
+
+    Args:
+        rvmod (rv_model): The rv_model. Its keplerians are reparametrised with (P, e, w, K, Tc).
+
+    Returns:
+        pd.DataFrame: One row per planet with columns planet, Tc, P, Tc_err and P_err.
+    """
+    import pandas as pd
+    for i in range(rvmod.nkep):
+        rvmod.set_keplerian_param(f'{i}', ['P', 'e', 'w', 'K', 'Tc'])
+    # The covariance is inverted once for all the planets
+    param_err = rvmod.get_param_error()[1]
+    rows = []
+    for pla in range(rvmod.nkep):
+        rows.append({
+            'planet': f'planet_{pla+1}',
+            'Tc': rvmod.get_param(f'kep.{pla}.Tc') + rvmod.t0 + 2400000,
+            'P': rvmod.get_param(f'kep.{pla}.P'),
+            'Tc_err': param_err[rvmod.fit_param.index(f'kep.{pla}.Tc')],
+            'P_err': param_err[rvmod.fit_param.index(f'kep.{pla}.P')],
+        })
+    return pd.DataFrame(rows, columns=['planet', 'Tc', 'P', 'Tc_err', 'P_err'])
+
+
+def lightcurve_windows(lightcurves, labels=None):
+    """Time windows covered by light curves, in BJD.
+
+    Args:
+        lightcurves (list or dict): Light curves as FITS HDU lists (time in the 'time' column of
+            the first extension), lk.LightCurve objects or arrays of times, all in BTJD. A dict
+            is keyed by the labels of the light curves.
+        labels (list, optional): Labels of the light curves. Defaults to their position.
+
+    Returns:
+        pd.DataFrame: One row per light curve with columns lc, t_start and t_end, the first and
+        last times of the light curve.
+    """
+    import pandas as pd
+    if isinstance(lightcurves, dict):
+        labels, lightcurves = list(lightcurves.keys()), list(lightcurves.values())
+    if labels is None:
+        labels = list(range(len(lightcurves)))
+    starts, ends = [], []
+    for lc in lightcurves:
+        if hasattr(lc, 'time') and hasattr(lc.time, 'value'):
+            times = lc.time.value
+        elif isinstance(lc, np.ndarray):
+            times = lc
+        else:
+            times = lc[1].data['time']
+        starts.append(times[0] + 2457000)
+        ends.append(times[-1] + 2457000)
+    return pd.DataFrame({'lc': labels, 't_start': starts, 't_end': ends})
+
+
+def predict_transit_windows(ephemerides, windows, on=None, n_epochs=500):
+    """Predicted transits falling in light curve windows, for all the planets and windows at once.
+
+    A transit at epoch n has the time Tc + n P and the uncertainty sqrt((n P_err)^2 + Tc_err^2).
+    It is kept if its time or either end of its uncertainty interval falls strictly inside a
+    window. As in get_predicted_transits, the epochs considered for a window start one period
+    before its first time and span n_epochs periods.
+
+    Args:
+        ephemerides (pd.DataFrame): Planets with columns Tc, P, Tc_err and P_err (see
+            transit_ephemerides), and any identifying columns.
+        windows (pd.DataFrame): Light curve windows with columns t_start and t_end (see
+            lightcurve_windows), and any identifying columns.
+        on (str or list, optional): Columns present in both tables (e.g. the star name) restricting
+            the pairs of planets and windows. Defaults to None (all the pairs).
+        n_epochs (int, optional): Number of epochs considered for each pair. Defaults to 500.
+
+    Returns:
+        pd.DataFrame: One row per predicted transit, with the columns of both tables and epoch,
+        transit_time, transit_err, lower and upper.
+    """
+    import pandas as pd
+    if on is None:
+        pairs = ephemerides.merge(windows, how='cross')
+    else:
+        pairs = ephemerides.merge(windows, on=on)
+    Tc, P = pairs['Tc'].to_numpy(float), pairs['P'].to_numpy(float)
+    Tc_err, P_err = pairs['Tc_err'].to_numpy(float), pairs['P_err'].to_numpy(float)
+    t_start, t_end = pairs['t_start'].to_numpy(float), pairs['t_end'].to_numpy(float)
+
+    # Candidate epochs: those whose widest possible interval can reach the window
+    n_first = np.trunc((t_start - Tc) / P).astype(np.int64) - 1
+    n_last = n_first + n_epochs - 1
+    max_err = np.hypot(np.maximum(np.abs(n_first), np.abs(n_last)) * P_err, Tc_err)
+    n_lo = np.maximum(np.ceil((t_start - max_err - Tc) / P), n_first).astype(np.int64)
+    n_hi = np.minimum(np.floor((t_end + max_err - Tc) / P), n_last).astype(np.int64)
+    counts = np.maximum(n_hi - n_lo + 1, 0)
+    pair = np.repeat(np.arange(len(pairs)), counts)
+    epoch = n_lo[pair] + np.arange(counts.sum()) - \
+        np.repeat(np.cumsum(counts) - counts, counts)
+
+    transit_time = Tc[pair] + epoch * P[pair]
+    transit_err = np.sqrt((epoch * P_err[pair]) ** 2 + Tc_err[pair] ** 2)
+    lower, upper = transit_time - transit_err, transit_time + transit_err
+    start, end = t_start[pair], t_end[pair]
+    keep = ((transit_time > start) & (transit_time < end)) | \
+        ((lower > start) & (lower < end)) | ((upper > start) & (upper < end))
+
+    transits = pairs.iloc[pair[keep]].reset_index(drop=True)
+    transits['epoch'] = epoch[keep]
+    transits['transit_time'] = transit_time[keep]
+    transits['transit_err'] = transit_err[keep]
+    transits['lower'] = lower[keep]
+    transits['upper'] = upper[keep]
+    return transits
+
+
 def get_predicted_transits(rvmod, lightcurve):
     """Get the predicted transit times based on the RV fit
 
@@ -386,103 +1111,183 @@ def get_predicted_transits(rvmod, lightcurve):
         lightcurve (hdul): The hdul containing the lightcurve data
 
     Returns:
-        _type_: _description_
+        tuple: Dicts keyed by planet (planet_1, planet_2...) of the predicted transit times
+        and of their (lower, upper) uncertainty intervals. See predict_transit_windows for
+        several light curves at once.
     """
-    for i in range(rvmod.nkep):
-        rvmod.set_keplerian_param(f'{i}', ['P', 'e', 'w', 'K', 'Tc'])
-
+    ephemerides = transit_ephemerides(rvmod)
+    transits = predict_transit_windows(
+        ephemerides, lightcurve_windows([lightcurve]))
     future_transit_times = {}
     future_transit_err = {}
-    lc_data = lightcurve[1].data
-    for pla in range(rvmod.nkep):
-        planet_idx = pla
-        period_err = rvmod.get_param_error(
-        )[1][rvmod.fit_param.index(f'kep.{planet_idx}.P')]
-        Tc_err = rvmod.get_param_error(
-        )[1][rvmod.fit_param.index(f'kep.{planet_idx}.Tc')]
-        transit_time = rvmod.get_param(
-            f'kep.{planet_idx}.Tc') + rvmod.t0 + 2400000
-        future_transit_times[f'planet_{pla+1}'] = []
-        future_transit_err[f'planet_{pla+1}'] = []
-        lc_times = lc_data['time']+2457000
-        n_start = int((lc_times[0]-transit_time) /
-                      rvmod.get_param(f'kep.{planet_idx}.P'))-1
-        # future_transit_times[f'planet_{pla+1}'][f'sector_{sect}'] = []
-        # future_transit_err[f'planet_{pla+1}'][f'sector_{sect}'] = []
-        for n in np.linspace(n_start, n_start+499, 500, dtype='int'):
-            future_transit = transit_time + \
-                (n*rvmod.get_param(f'kep.{planet_idx}.P'))
-            transit_err = np.sqrt((n*period_err)**2 + Tc_err**2)
-            future_transit_lower = future_transit-transit_err
-            future_transit_upper = future_transit+transit_err
-            if (future_transit > lc_times[0] and future_transit < lc_times[-1]) or (future_transit_lower > lc_times[0] and future_transit_lower < lc_times[-1]) or (future_transit_upper > lc_times[0] and future_transit_upper < lc_times[-1]):
-                future_transit_times[f'planet_{pla+1}'].append(
-                    future_transit)
-                future_transit_err[f'planet_{pla+1}'].append(
-                    (future_transit_lower, future_transit_upper))
+    for planet in ephemerides['planet']:
+        planet_transits = transits[transits['planet'] == planet]
+        future_transit_times[planet] = list(planet_transits['transit_time'])
+        future_transit_err[planet] = list(
+            zip(planet_transits['lower'], planet_transits['upper']))
 
     return future_transit_times, future_transit_err
 
 
-def list_tess_lightcurves(target, output_format='pandas', accepted_pipelines=['SPOC', 'TESS-SPOC', 'QLP'], verbose=True):
+_mast_lc_columns = [
+    "target_name",
+    "sequence_number",
+    "provenance_name",
+    "obs_id",
+    "t_exptime",
+    "obs_title"
+]
+
+
+def _preferred_pipeline_mask(listing, accepted_pipelines, by=('sequence_number',)):
+    """Rows of a light curve listing kept by the pipeline preference: in each group of rows
+    (by default a sector) with several light curves, only those of the first pipeline of
+    accepted_pipelines present in the group, unless none of them is present. Rows with a missing
+    value in by (e.g. no sequence_number) are grouped together rather than dropped.
+
+    Args:
+        listing (pd.DataFrame): Listing with a provenance_name column and the columns of by.
+        accepted_pipelines (list): Pipelines, by order of preference.
+        by (tuple, optional): Columns defining the groups. Defaults to ('sequence_number',).
+
+    Returns:
+        np.array: Boolean mask of the kept rows.
+    """
+    n_accepted = len(accepted_pipelines)
+    rank = listing['provenance_name'].map(
+        {pipeline: i for i, pipeline in enumerate(accepted_pipelines)}).fillna(n_accepted)
+    groups = rank.groupby([listing[col] for col in by], sort=False, dropna=False)
+    best_rank = groups.transform('min')
+    group_size = groups.transform('size')
+    keep = (group_size == 1) | (best_rank == n_accepted) | (rank == best_rank)
+    return keep.to_numpy()
+
+
+def _tic_number(target):
+    return str(target).upper().replace('TIC', '').strip().lstrip('0') or '0'
+
+
+def list_tess_lightcurves_batch(targets, accepted_pipelines=['SPOC', 'TESS-SPOC', 'QLP'], chunk_size=100,
+                                use_cache=True, cache_dir=None, verbose=True):
+    """Lists the TESS light curves of many targets, querying MAST for chunks of targets at once.
+
+    Each target's raw listing is cached locally (as CSV, for config.tess_listing_cache_ttl
+    seconds), so only the targets missing from the cache are queried. The pipeline preference of
+    list_tess_lightcurves is applied to all the targets at once.
+
+    Args:
+        targets (list): TIC IDs, as integers or strings ('TIC 123456789' or '123456789').
+        accepted_pipelines (list, optional): Pipelines to accept, by order of preference.
+            Defaults to ['SPOC', 'TESS-SPOC', 'QLP'].
+        chunk_size (int, optional): Number of targets per MAST query. Defaults to 100.
+        use_cache (bool, optional): Whether to use the local listing cache. Defaults to True.
+        cache_dir (str, optional): Root of the local cache. Defaults to config.cache_dir.
+        verbose (bool, optional): Whether to log the progress. Defaults to True.
+
+    Returns:
+        pd.DataFrame: The selected light curves of all the targets, with the columns of
+        list_tess_lightcurves, sorted by target, sector and pipeline.
+    """
+    import pandas as pd
+    from astroquery.mast import Observations
+    from .cache import cache_key
+    tics = list(dict.fromkeys(_tic_number(target) for target in targets))
+    listings = {}
+    if use_cache:
+        _, listing_cache = _tess_caches(cache_dir)
+        for tic in tics:
+            path = listing_cache.get(cache_key('mast_timeseries_tic', tic), '.csv')
+            if path is not None:
+                listings[tic] = pd.read_csv(path, dtype={'target_name': str})
+    missing = [tic for tic in tics if tic not in listings]
+    if verbose:
+        logging.info(
+            f"[INFO] {len(tics) - len(missing)} targets in cache, querying MAST for {len(missing)} "
+            f"in {-(-len(missing) // chunk_size)} requests")
+
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        obs = Observations.query_criteria(
+            target_name=chunk,
+            dataproduct_type="timeseries"
+        )
+        df = obs.to_pandas()[_mast_lc_columns] if len(obs) > 0 else \
+            pd.DataFrame(columns=_mast_lc_columns)
+        df['target_name'] = df['target_name'].astype(str)
+        by_target = dict(list(df.groupby('target_name', sort=False)))
+        for tic in chunk:
+            listings[tic] = by_target.get(
+                tic, pd.DataFrame(columns=_mast_lc_columns))
+            if use_cache:
+                key = cache_key('mast_timeseries_tic', tic)
+                tmp = listing_cache.temp_path(key, '.csv')
+                listings[tic].to_csv(tmp, index=False)
+                listing_cache.put(key, tmp, '.csv')
+
+    frames = [listings[tic] for tic in tics if len(listings[tic]) > 0]
+    if len(frames) == 0:
+        return pd.DataFrame(columns=_mast_lc_columns)
+    df = pd.concat(frames, ignore_index=True)
+    df = df[df['provenance_name'].isna() | df['provenance_name'].isin(
+        accepted_pipelines)].reset_index(drop=True)
+    df = df[_preferred_pipeline_mask(
+        df, accepted_pipelines, by=('target_name', 'sequence_number'))]
+    return df.sort_values(["target_name", "sequence_number", "provenance_name"]).reset_index(drop=True)
+
+
+def list_tess_lightcurves(target, output_format='pandas', accepted_pipelines=['SPOC', 'TESS-SPOC', 'QLP'], verbose=True,
+                          use_cache=False, cache_dir=None):
     from astroquery.mast import Observations
     """
     target: TIC ID string ('TIC 123456789') or coordinates
     output_format: str, either 'pandas' or 'original'
     accepted_pipelines: list of str, the pipelines to accept (by order of preference)
+    use_cache: bool, whether to reuse the MAST listing of the target for config.tess_listing_cache_ttl seconds
     """
 
-    obs = Observations.query_criteria(
-        target_name=target,
-        dataproduct_type="timeseries"
-    )
-
-    # Filter by accepted pipelines
-    mask = obs['provenance_name'] == None
-    for pipeline in accepted_pipelines:
-        mask |= obs['provenance_name'] == pipeline
-    obs = obs[mask]
+    obs = None
+    if use_cache:
+        from astropy.table import Table
+        from .cache import cache_key
+        _, listing_cache = _tess_caches(cache_dir)
+        listing_key = cache_key('mast_timeseries', _normalize_target(target))
+        listing = listing_cache.get(listing_key, '.ecsv')
+        if listing is not None:
+            obs = Table.read(listing, format='ascii.ecsv')
+    if obs is None:
+        obs = Observations.query_criteria(
+            target_name=target,
+            dataproduct_type="timeseries"
+        )
+        if use_cache:
+            tmp = listing_cache.temp_path(listing_key, '.ecsv')
+            obs.write(tmp, format='ascii.ecsv', overwrite=True)
+            listing_cache.put(listing_key, tmp, '.ecsv')
+
+    # Filter by accepted pipelines, keeping the preferred one in each sector
+    listing = obs[['sequence_number', 'provenance_name']].to_pandas()
+    accepted = listing['provenance_name'].isna() | listing['provenance_name'].isin(
+        accepted_pipelines)
+    obs = obs[accepted.to_numpy()]
+    listing = listing[accepted].reset_index(drop=True)
 
     if len(obs) == 0:
         print(f"No light curves found for {target}")
         return None
-    for sector in np.unique(obs['sequence_number']):
-        if len(obs[obs['sequence_number'] == sector]) > 1:
-            if verbose:
-                logging.warning(
-                    f"Multiple light curves found for {target} in sector {sector}. Attempting to filter by pipeline.")
-            for pipeline in accepted_pipelines:
-                if pipeline in obs['provenance_name'][obs['sequence_number'] == sector]:
-                    obs = obs[~((obs['sequence_number'] == sector)
-                                & (obs['provenance_name'] != pipeline))]
-                    break
+    if verbose:
+        for sector in np.unique(listing['sequence_number'][listing['sequence_number'].duplicated()]):
+            logging.warning(
+                f"Multiple light curves found for {target} in sector {sector}. Attempting to filter by pipeline.")
+    obs = obs[_preferred_pipeline_mask(listing, accepted_pipelines)]
 
     if output_format == 'pandas':
         df = obs.to_pandas()
-        cols = [
-            "target_name",
-            "sequence_number",
-            "provenance_name",
-            "obs_id",
-            "t_exptime",
-            "obs_title"
-        ]
-
-        df = df[cols].sort_values(
+        df = df[_mast_lc_columns].sort_values(
             ["sequence_number", "provenance_name"]
         )
     elif output_format == 'both':
         df = obs.to_pandas()
-        cols = [
-            "target_name",
-            "sequence_number",
-            "provenance_name",
-            "obs_id",
-            "t_exptime",
-            "obs_title"
-        ]
-
-        df = df[cols].sort_values(
+        df = df[_mast_lc_columns].sort_values(
             ["sequence_number", "provenance_name"]
         )
         return df, obs
@@ -492,9 +1297,9 @@ def list_tess_lightcurves(target, output_format='pandas', accepted_pipelines=['S
     return df
 
 
-def get_numax_init(time, flux):
+def get_numax_init(time, flux, use_float32=False, verbose=False):
     from scipy.signal import savgol_filter
-    from astropy.timeseries import LombScargle
+    from .tseries import fast_lomb_scargle
     # remove NaNs
     m = np.isfinite(time) & np.isfinite(flux)
     time = time[m]
@@ -507,8 +1312,8 @@ def get_numax_init(time, flux):
     # -------------------------
     freq = np.linspace(1, 300, 5000)  # µHz region of interest
 
-    ls = LombScargle(time, flux)
-    power = ls.power(freq * 1e-6)  # convert µHz → Hz internally
+    power = fast_lomb_scargle(time, flux, freq * 1e-6,  # convert µHz → Hz internally
+                              use_float32=use_float32)
 
     power = np.array(power)
 
@@ -525,7 +1330,8 @@ def get_numax_init(time, flux):
     p_sub = smooth[mask]
     # νmax guess = peak
     nu_max = f_sub[np.argmax(p_sub)]
-    print(nu_max)
+    if verbose:
+        logging.info(f"[INFO] Initial numax guess: {nu_max:.2f} uHz")
     return nu_max, freq, power, smooth
 # def estimate_numax(freq_uHz, power,
 #                    fmin=40.0,
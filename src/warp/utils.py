@@ -22,7 +22,7 @@ def secular_acceleration(pmra, pmdec, parallax):
     return dvdt
 
 
-def get_astrometric_data(star_name, astrometric_table=None, verbose=True):
+def get_astrometric_data(star_name, astrometric_table=None, verbose=True, use_cache=False, cache_dir=None):
     if astrometric_table is not None:
         if (verbose):
             print(
@@ -50,6 +50,9 @@ def get_astrometric_data(star_name, astrometric_table=None, verbose=True):
                     plx = row.get('plx_value', row.get(
                         'parallax', row.get('PLX_VALUE', None)))
 
+                    source = row.get('source', 'simbad')
+                    if not isinstance(source, str):
+                        source = 'simbad'
                     if pmra is not None and pmdec is not None and plx is not None:
                         if verbose:
                             print(
@@ -58,7 +61,7 @@ def get_astrometric_data(star_name, astrometric_table=None, verbose=True):
                             "pmra": float(pmra) * u.mas/u.yr,
                             "pmdec": float(pmdec) * u.mas/u.yr,
                             "parallax": float(plx) * u.mas,
-                            "source": 'simbad',
+                            "source": source,
                         }
             else:
                 # Try astropy table
@@ -105,6 +108,14 @@ def get_astrometric_data(star_name, astrometric_table=None, verbose=True):
                 print(
                     f"[WARN] Could not extract data from astrometric_table for {star_name}: {e}")
 
+    if use_cache:
+        from .astrometry import load_astrometry
+        cached = load_astrometry([star_name], cache_dir=cache_dir)
+        if star_name in cached:
+            if verbose:
+                print(f"Found astrometric data for {star_name} in the local store.")
+            return cached[star_name]
+
     try:
         results = query_gaia(star_name, verbose=verbose)
     except Exception as e:
@@ -120,10 +131,13 @@ def get_astrometric_data(star_name, astrometric_table=None, verbose=True):
             if verbose:
                 print(f"[WARN] Simbad query failed: {e}.")
             results = None
+    if use_cache and results is not None:
+        from .astrometry import store_astrometry
+        store_astrometry({star_name: results}, cache_dir=cache_dir)
     return results
 
 
-def apply_secular_correction(star_name, jd, rv, jd_ref=None, verbose=True, astrometric_table=None):
+def apply_secular_correction(star_name, jd, rv, jd_ref=None, verbose=True, astrometric_table=None, use_cache=False):
     if star_name is None:
         if verbose:
             print(
@@ -131,7 +145,7 @@ def apply_secular_correction(star_name, jd, rv, jd_ref=None, verbose=True, astro
         return rv
 
     results = get_astrometric_data(
-        star_name, astrometric_table=astrometric_table, verbose=verbose)
+        star_name, astrometric_table=astrometric_table, verbose=verbose, use_cache=use_cache)
 
     if results is None:
         if verbose: